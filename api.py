@@ -0,0 +1,250 @@
+import hashlib  # Importing the hashlib module for the ETags
+import json  # Importing the json module for serializing the answers
+from flask import Blueprint, Response, current_app, jsonify, request  # Importing the parts of Flask used by the API
+from storage import POKEMON_COLUMNS, STATS_COLUMNS  # Importing the columns of the roster
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')  # Registered by app.py, which puts its PokemonGo in app.extensions['pokedex']
+
+LIST_COLUMNS = POKEMON_COLUMNS[1:]  # Columns of the roster stored as comma separated types
+STATS = ['total', 'hp', 'attack', 'defense', 'special_attack', 'special_defense', 'speed']
+POKEMON_FIELDS = POKEMON_COLUMNS + STATS_COLUMNS[1:]  # Fields of /pokemon/<name>
+MATCHUP_FIELDS = ['weaknesses', 'resistances', 'immunities', 'advantages', 'multipliers']  # Fields of /types
+STREAM_PAGE_SIZE = 1000  # Pokémon read from the roster per step of a streamed list
+ROSTER_CACHE_CONTROL = 'no-cache'  # The roster can change at any time, clients keep the answer and revalidate it with its ETag
+TYPES_CACHE_CONTROL = 'public, max-age=86400'  # The type chart barely changes
+
+class ApiError(Exception):
+    """
+    Class representing an error of a request to the API, answered as {"error": message} with its status code.
+    """
+
+    def __init__(self, message, status=400):
+        """
+        Constructor method to initialize the ApiError object.
+        """
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+@api.errorhandler(ApiError)
+def api_error(error):
+    """
+    Function to answer an error of the API as JSON.
+    """
+    return jsonify({'error': error.message}), error.status
+
+def get_pokedex():
+    """
+    Function to get the PokemonGo object of the application.
+    """
+    return current_app.extensions['pokedex']
+
+def fields(available):
+    """
+    Function to read the fields asked for with ?fields=name,type (all of them by default).
+    Raises ApiError if one of them doesn't exist.
+    """
+    asked = [field.strip() for value in request.args.getlist('fields') for field in value.split(',') if field.strip()]
+    unknown = [field for field in asked if field not in available]
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}. The available fields are: {', '.join(available)}.")
+    return asked or list(available)
+
+def select(record, selected):
+    """
+    Function to keep only the selected fields of a record.
+    """
+    return {field: record.get(field) for field in selected}
+
+def split_lists(row):
+    """
+    Function to convert the comma separated types of a roster row to lists.
+    """
+    row = dict(row)
+    for column in LIST_COLUMNS:
+        if column in row:
+            row[column] = row[column].split(', ') if row[column] else []
+    return row
+
+def roster_etag(*parts):
+    """
+    Function to get the ETag of an answer built from the roster: it changes with the roster version and the query.
+    """
+    key = '\n'.join([request.path, request.query_string.decode('utf-8')] + [str(part) for part in parts])
+    return f"v{get_pokedex().roster_version()}-{hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()}"
+
+def conditional(etag, cache_control):
+    """
+    Function to answer 304 if the client already has the version with the given ETag, None otherwise.
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = cache_control
+        return response
+    return None
+
+def json_answer(data, etag, cache_control):
+    """
+    Function to answer with a JSON document and its caching headers.
+    """
+    response = Response(json.dumps(data, separators=(',', ':')), mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+def stream_answer(records, etag, cache_control):
+    """
+    Function to answer with a JSON array written while its records are read, so large lists are never held in memory.
+    """
+    def generate():
+        """
+        Function to write the array one record at a time.
+        """
+        yield '['
+        for i, record in enumerate(records):
+            yield (',' if i else '') + json.dumps(record, separators=(',', ':'))
+        yield ']'
+
+    response = Response(generate(), mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+def stats_query():
+    """
+    Function to read the stat, filters and maximum number of Pokémon asked for in the query string of /stats.
+    """
+    stat = request.args.get('stat', 'total')
+    if stat not in STATS:
+        raise ApiError(f"Unknown stat {stat}. The available stats are: {', '.join(STATS)}.")
+    types = [type.strip().lower() for value in request.args.getlist('type') for type in value.split(',') if type.strip()]
+    minimums = {}
+    for key in STATS:
+        value = request.args.get('min_' + key)
+        if value is not None:
+            if not value.isdigit():
+                raise ApiError(f"min_{key} must be a number.")
+            minimums[key] = int(value)
+    limit = request.args.get('limit')
+    if limit is not None and not limit.isdigit():
+        raise ApiError("limit must be a number.")
+    return stat, types, minimums, int(limit) if limit is not None else None
+
+@api.route('/pokemon')
+def pokemon_list():
+    """
+    Route to get every registered Pokémon, in the order they were registered, as a streamed JSON array.
+    ?fields=name,type selects the fields of each Pokémon.
+    """
+    selected = fields(POKEMON_COLUMNS)
+    etag = roster_etag()
+    not_modified = conditional(etag, ROSTER_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
+    storage = get_pokedex().storage
+
+    def records():
+        """
+        Function to read the roster a page at a time while the answer is written.
+        """
+        after = 0
+        while after is not None:
+            rows, after = storage.pokemons_page(after, STREAM_PAGE_SIZE)
+            for row in rows:
+                yield select(split_lists(row), selected)
+
+    return stream_answer(records(), etag, ROSTER_CACHE_CONTROL)
+
+@api.route('/pokemon/<name>')
+def pokemon_detail(name):
+    """
+    Route to get the details and stats of a Pokémon. The registered ones are read from the roster,
+    the others are looked up in the PokéAPI (through the cache) and have "registered": false.
+    ?fields=name,hp selects the fields.
+    """
+    pokedex = get_pokedex()
+    name = pokedex.clean_name(name)
+    selected = fields(POKEMON_FIELDS + ['registered'])
+    etag = roster_etag(name)
+    not_modified = conditional(etag, ROSTER_CACHE_CONTROL)
+    if not_modified:
+        return not_modified  # Pokémon that aren't registered don't change either while the roster version is the same
+    row = pokedex.storage.pokemon(name)
+    if row is not None:
+        record = split_lists(row)
+        record['registered'] = True
+    else:
+        info = pokedex.resolve(name)
+        if info['notFound'] and info['error']:
+            raise ApiError(f"The Pokémon {name} could not be looked up: {info['error']}.", 502)
+        if info['notFound']:
+            raise ApiError(f"The Pokémon {name} was not found.", 404)
+        record = split_lists(pokedex.pokemon_row(name, info))
+        record.update({column: value for column, value in pokedex.stats_row(name, info).items() if column != 'name'})
+        record['total'] = sum(record[column] for column in STATS[1:])
+        record['registered'] = False
+    return json_answer(select(record, selected), etag, ROSTER_CACHE_CONTROL)
+
+@api.route('/types')
+def types():
+    """
+    Route to get the weaknesses, resistances, immunities, advantages and damage multipliers of every type.
+    ?fields=weaknesses,advantages selects the fields of each type.
+    """
+    selected = fields(MATCHUP_FIELDS)
+    chart = get_pokedex().type_chart()
+    if chart is None:
+        raise ApiError("The types data is not available, try again later.", 503)
+    data = {name: select(chart.matchup([name]), selected) for name in chart.names.tolist()}
+    etag = hashlib.blake2b(json.dumps(data, sort_keys=True).encode('utf-8'), digest_size=8).hexdigest()  # The chart has no version, the ETag is computed from the answer
+    return conditional(etag, TYPES_CACHE_CONTROL) or json_answer(data, etag, TYPES_CACHE_CONTROL)
+
+@api.route('/summary')
+def summary():
+    """
+    Route to get the aggregates of the roster: its version, the number of Pokémon, the number of Pokémon of each type,
+    the count, minimum, maximum, mean and histogram of each stat and the top Pokémon by total stats (?top=10, at most 1000).
+    """
+    top = request.args.get('top', '10')
+    if not top.isdigit():
+        raise ApiError("top must be a number.")
+    etag = roster_etag()
+    not_modified = conditional(etag, ROSTER_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
+    return json_answer(get_pokedex().roster_summary(min(int(top), STREAM_PAGE_SIZE)), etag, ROSTER_CACHE_CONTROL)
+
+@api.route('/stats')
+def stats():
+    """
+    Route to get the stats of the registered Pokémon, from the highest to the lowest value of a stat, as a streamed JSON array.
+    The query string can have stat=attack (default total), type=fire,flying, min_<stat>=100, limit=100 and fields=name,attack.
+    """
+    stat, types, minimums, limit = stats_query()
+    selected = fields(['name', 'type'] + STATS_COLUMNS[1:])
+    etag = roster_etag()
+    not_modified = conditional(etag, ROSTER_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
+    pokedex = get_pokedex()
+    try:
+        page = pokedex.query_stats(stat, STREAM_PAGE_SIZE if limit is None else min(limit, STREAM_PAGE_SIZE), types, minimums)  # The first page is read now, so a bad type is answered with 400
+    except ValueError as e:
+        raise ApiError(str(e))
+
+    def records(page):
+        """
+        Function to select the Pokémon a page at a time while the answer is written, following the cursor of query_stats.
+        """
+        remaining = limit
+        while True:
+            for pokemon in page['pokemons']:
+                yield select(pokemon, selected)
+            if remaining is not None:
+                remaining -= len(page['pokemons'])
+            if page['next'] is None or remaining == 0:
+                break
+            page = pokedex.query_stats(stat, STREAM_PAGE_SIZE if remaining is None else min(remaining, STREAM_PAGE_SIZE), types, minimums, page['next'])
+
+    return stream_answer(records(page), etag, ROSTER_CACHE_CONTROL)
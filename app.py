@@ -1,102 +1,385 @@
-from flask import Flask, render_template, request, redirect, url_for
+from flask import Flask, render_template, request, redirect, url_for, g, Response
 from pokemon import PokemonGo
-import pandas as pd
+from api import api
+from storage import POKEMON_COLUMNS
+from snapshot import environment_pack
+import click
+import cProfile
+import gzip
+import hashlib
+import io
+import json
 import os
-import plotly.graph_objects as go
-import plotly.offline as pyo
-from plotly.subplots import make_subplots
+import pstats
+import threading
+import time
 
 app = Flask(__name__)
-pokedex = PokemonGo()
+app.config['PROFILE'] = os.environ.get('POKEHUB_PROFILE') == '1'  # Lets ?profile=1 show where a single request spends its time
+pokedex = PokemonGo(url=os.environ.get('POKEHUB_API_URL', 'https://pokeapi.co/api/v2/'), pack=environment_pack(), refresh=True)  # Works offline from a data pack when POKEHUB_OFFLINE is set, POKEHUB_API_URL points it to another API (eg. the benchmark stub), expired data is refreshed in the background
+app.extensions['pokedex'] = pokedex  # Used by the JSON API
+app.register_blueprint(api)  # JSON API under /api/v1
+views = {}  # Rendered views and the roster version they were built from
+profiling = threading.Lock()  # Only one request can be profiled at a time
+warming = threading.Lock()  # Taken (and never released) by the first request, which starts the warmup
+
+@app.before_request
+def start_request():
+    """
+    Function run before every request: it starts timing it and, in profiling mode, profiling it. The first request also starts the warmup.
+    """
+    g.start = time.perf_counter()
+    if warming.acquire(blocking=False):
+        pokedex.warmup(background=True)  # Create the types data while the first requests are answered, importing the app does no I/O
+    g.route = request.url_rule.rule if request.url_rule else 'unmatched'  # The rule, not the URL, so the metrics have few labels
+    pokedex.metrics.route.set(g.route)  # Requests to the PokéAPI are counted for this route
+    if app.config['PROFILE'] and request.args.get('profile') and profiling.acquire(blocking=False):
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+@app.after_request
+def finish_request(response):
+    """
+    Function run after every request: it records its duration and, in profiling mode, answers with the profile instead of the page.
+    """
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        profiling.release()
+        response = profile_response(profiler)
+    pokedex.metrics.observe('pokehub_http_request_seconds', time.perf_counter() - g.start, route=g.route, method=request.method, status=response.status_code)
+    return response
+
+@app.teardown_request
+def end_request(error=None):
+    """
+    Function run at the end of every request, the thread may answer requests of other routes later.
+    """
+    pokedex.metrics.route.set('')
+
+def profile_response(profiler):
+    """
+    Function to answer with the functions where the request spent the most time, also saved to profiles/ for tools like snakeviz.
+    """
+    os.makedirs('profiles', exist_ok=True)
+    path = os.path.join('profiles', f"{request.endpoint}-{time.strftime('%Y%m%d-%H%M%S')}.prof")
+    profiler.dump_stats(path)
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.sort_stats('cumulative').print_stats(40)  # The 40 functions with the highest cumulative time
+    return Response(f"Profile saved to {path}\n\n" + output.getvalue(), mimetype='text/plain')
+
+def render(template, **context):
+    """
+    Function to render a template, timing it for the metrics.
+    """
+    with pokedex.metrics.timer('pokehub_render_seconds', view=request.endpoint, step='template'):
+        return render_template(template, **context)
+
+def plot_div(figure):
+    """
+    Function to render a plotly figure as a div, timing it for the metrics.
+    """
+    import plotly.offline as pyo  # Imported here, only the pages with a server-rendered figure need plotly
+    with pokedex.metrics.timer('pokehub_render_seconds', view=request.endpoint, step='plotly'):
+        return pyo.plot(figure, output_type='div', include_plotlyjs=False)
+
+@app.route('/metrics')
+def metrics():
+    """
+    Route to expose the counters and timings of the application in the Prometheus text format.
+    """
+    metrics = pokedex.metrics
+    cache = pokedex.cache.stats()
+    metrics.set('pokehub_cache_entries', cache['entries'])
+    metrics.set('pokehub_cache_bytes', cache['bytes'])
+    lookups = metrics.total('pokehub_cache_requests_total')
+    metrics.set('pokehub_cache_hit_ratio', round(metrics.get('pokehub_cache_requests_total', result='hit') / lookups, 4) if lookups else 0)
+    metrics.set('pokehub_log_dropped_total', pokedex.log.dropped)
+    if pokedex.refresher is not None:
+        metrics.set('pokehub_refresh_queue', pokedex.refresher.queued())
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/')
 def home():
     message = ""
-    return render_template('home.html', message=message)
+    return render('home.html', message=message)
 
-@app.route('/add', methods=['POST'])
-def add():
+def form_name():
+    """
+    Function to read the Pokémon name sent in the registration form.
+    """
+    return pokedex.clean_name(request.form.get('pokemon'))
+
+def add_results(name, info):
+    """
+    Function to register a resolved Pokémon and render the results of the registration.
+    """
     messages=[]
-    name = request.form.get('pokemon').lower().replace(" ", "-")
-    if len(name) == 0:
-        messages.append("You must enter a Pokémon name.")
-        return render_template('home.html', messages=messages)
-    if name[len(name)-1] == "-":
-        name=name.replace("-", "")
-    basic_info = pokedex.basic_info(name)
-    if basic_info["notFound"]:
+    if info["notFound"] and info["error"]:
+        messages.append(f"The Pokémon could not be looked up, try again later: {info['error']}.")
+        image=""
+    elif info["notFound"]:
         messages.append("The Pokémon was not found.")
         image=""
     else:
-        image=pokedex.get_pokemon_image(name)
+        image=info["image"]
         messages.append(f'{name.capitalize()}')
-        messages.append(f'Type: {", ".join(basic_info["type"])}')
-        messages.append(f'Resistances: {", ".join(basic_info["resistant"])}')
-        messages.append(f'Weaknesses: {", ".join(basic_info["weaknesses"])}')
-        messages.append(f'Advantages: {", ".join(basic_info["advantages"])}')
+        messages.append(f'Type: {", ".join(info["type"])}')
+        messages.append(f'Resistances: {", ".join(info["resistant"])}')
+        messages.append(f'Weaknesses: {", ".join(info["weaknesses"])}')
+        if info["immune"]:
+            messages.append(f'Immunities: {", ".join(info["immune"])}')
+        messages.append(f'Advantages: {", ".join(info["advantages"])}')
     
-    if not basic_info["notFound"] and not pokedex.pokemon_already_saved(name) :
-        pokedex.save_pokemon(name)
-        pokedex.get_pokemon_stats(name)
+    if not info["notFound"]:
+        pokedex.register(name, info)  # Save the Pokémon unless it is already in the roster
     
-    return render_template('home.html', messages=messages, image=image)
+    return render('home.html', messages=messages, image=image)
+
+@app.route('/add', methods=['POST'])
+def add():
+    name = form_name()
+    if len(name) == 0:
+        return render('home.html', messages=["You must enter a Pokémon name."])
+    info = pokedex.resolve(name)  # Fetch the Pokémon once and derive everything from that response
+    return add_results(name, info)
+
+@app.route('/async/add', methods=['POST'])
+async def add_async():
+    """
+    Async variant of /add, the worker is free to run other coroutines while the PokéAPI answers.
+    Needs the optional aiohttp and flask[async] packages.
+    """
+    from async_pokemon import AsyncPokemonGo  # Imported here so the synchronous routes don't need aiohttp
+    name = form_name()
+    if len(name) == 0:
+        return render('home.html', messages=["You must enter a Pokémon name."])
+    async with AsyncPokemonGo(pokedex) as api:
+        info = await api.resolve(name)  # Fetch the Pokémon once and derive everything from that response
+    return add_results(name, info)
+
+@app.route('/add_bulk', methods=['POST'])
+def add_bulk():
+    """
+    Route to register several Pokémon at once, typed in the form or uploaded as a file with one name per line (or separated by commas).
+    """
+    text = request.form.get('pokemons', '')
+    upload = request.files.get('file')
+    if upload:
+        text += "\n" + upload.read().decode('utf-8', errors='replace')
+    names = pokedex.read_names(text)
+    if not names:
+        return render('home.html', messages=["You must enter at least one Pokémon name."])
+    report = pokedex.register_many(names)  # Resolve all the new names concurrently and save them in a single transaction
+    messages = [f"Added {len(report['added'])} Pokémon: {', '.join(report['added'])}"]
+    if report['already_saved']:
+        messages.append(f"Already registered: {', '.join(report['already_saved'])}")
+    if report['not_found']:
+        messages.append(f"Not found: {', '.join(report['not_found'])}")
+    if report['failed']:
+        messages.append(f"Could not be looked up, try again later: {', '.join(f'{name} ({reason})' for name, reason in report['failed'])}")
+    return render('home.html', messages=messages)
+
+@app.route('/compare', methods=['GET', 'POST'])
+def compare():
+    """
+    Route to analyze the type matchups of a team of up to 6 Pokémon against some opponents, by default the whole Pokédex.
+    """
+    if request.method == 'GET':
+        return render('compare.html')
+    team = request.form.get('team', '')
+    opponents = request.form.get('opponents', '')
+    form = {'team': team, 'opponents': opponents}  # Keep what was typed in the form
+    names = pokedex.read_names(team)
+    if not names:
+        return render('compare.html', messages=["You must enter at least one Pokémon name."], **form)
+    try:
+        analysis = pokedex.analyze_team(names, pokedex.read_names(opponents) or None)  # No opponents means the whole Pokédex
+    except ValueError as e:
+        return render('compare.html', messages=[str(e)], **form)
+    if analysis is None:
+        return render('compare.html', messages=["The types data is not available, try again later."], **form)
+    messages = [f"Not found: {', '.join(analysis['not_found'])}"] if analysis['not_found'] else []
+    import plotly.graph_objects as go  # Imported here, the other routes don't need plotly
+    coverage = analysis['coverage']
+    types = list(next(iter(coverage.values())).keys())
+    heatmap = go.Figure(data=[go.Heatmap(z=[list(row.values()) for row in coverage.values()], x=types, y=list(coverage.keys()),
+                                         colorscale='RdYlGn_r', zmin=0, zmax=4)])  # Red for the types that hit the team hard
+    heatmap.update_layout(title="Damage taken by your team",
+                          xaxis_title="Attacking type",
+                          yaxis_title="Pokémon")
+    return render('compare.html', analysis=analysis, plot_div=plot_div(heatmap), messages=messages, **form)
+
+PAGE_SIZE = 20  # Pokémon shown per page of the stats
+TABLE_PAGE_SIZE = 50  # Pokémon shown per page of the table
+MAX_PAGE_SIZE = 200
+STATS = ['total', 'hp', 'attack', 'defense', 'special_attack', 'special_defense', 'speed']
+
+def cached_view(name, build):
+    """
+    Function to get the rendered content of a view, building it again only when the roster changed since it was cached.
+    name identifies the view and its parameters, eg. the page that was asked for.
+    """
+    version = pokedex.roster_version()  # The roster version changes on every insert and clear
+    cached = views.get(name)
+    if cached is None or cached[0] != version:
+        if len(views) > 256:
+            views.clear()  # Don't keep every page that was ever asked for
+        cached = (version, build())
+        views[name] = cached
+    return cached[1]
+
+def encode_json(data, status=200):
+    """
+    Function to serialize the data of a chart once, with its gzipped copy and an ETag computed from its content.
+    """
+    with pokedex.metrics.timer('pokehub_render_seconds', view=request.endpoint, step='json'):
+        body = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        return {
+            'body': body,
+            'gzip': gzip.compress(body, compresslevel=6),  # Compressed once, every later request sends the same bytes
+            'etag': hashlib.blake2b(body, digest_size=8).hexdigest(),  # Same data, same ETag, even if the roster changed somewhere else
+            'status': status
+        }
+
+def json_response(payload):
+    """
+    Function to answer with a serialized chart data, gzipped if the browser accepts it, or 304 if the browser already has it.
+    """
+    if payload['status'] == 200 and request.if_none_match.contains(payload['etag']):
+        response = Response(status=304)
+    elif 'gzip' in request.accept_encodings:
+        response = Response(payload['gzip'], status=payload['status'], mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(payload['body'], status=payload['status'], mimetype='application/json')
+    response.set_etag(payload['etag'])
+    response.headers['Cache-Control'] = 'no-cache'  # The browser keeps the data but asks again, the roster may have changed
+    response.vary.add('Accept-Encoding')
+    return response
+
+def page_size(default):
+    """
+    Function to read the number of Pokémon per page from the query string.
+    """
+    try:
+        return min(max(int(request.args.get('limit', default)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return default
+
+def table_query():
+    """
+    Function to read the page of the table asked for in the query string: ?after= is the position of the last Pokémon of the previous page.
+    """
+    after = request.args.get('after', '0')
+    return int(after) if after.isdigit() else 0, page_size(TABLE_PAGE_SIZE)
+
+def stats_query():
+    """
+    Function to read the stat, filters and page asked for in the query string of the stats.
+    """
+    stat = request.args.get('stat', 'total')
+    types = [type.strip().lower() for value in request.args.getlist('type') for type in value.split(',') if type.strip()]  # eg. type=fire,flying
+    minimums = {}
+    for key in STATS:
+        value = request.args.get('min_' + key, '')
+        if value.isdigit():
+            minimums[key] = int(value)
+    return stat, types, minimums, request.args.get('cursor') or None, page_size(PAGE_SIZE)
+
+def build_pokemons_data(after, limit):
+    """
+    Function to serialize a page of the table of the registered Pokémon as columns, the ones registered after the given position.
+    """
+    with pokedex.metrics.timer('pokehub_storage_seconds', operation='pokemons_page'):
+        rows, next_page = pokedex.storage.pokemons_page(after, limit)  # Only this page is read from the roster
+    return encode_json({
+        'columns': POKEMON_COLUMNS,
+        'cells': [[row[column] for row in rows] for column in POKEMON_COLUMNS],  # One list per column, as the plotly table expects
+        'next': next_page
+    })
+
+def build_stats_data(stat, types, minimums, cursor, limit):
+    """
+    Function to serialize a page of the registered Pokémon with the highest value of a stat as columns.
+    """
+    try:
+        page = pokedex.query_stats(stat, limit, types, minimums, cursor)  # Only this page is selected and read from the stats
+    except ValueError as e:
+        return encode_json({'error': str(e)}, status=400)
+    pokemons = page['pokemons']
+    return encode_json({
+        'stat': stat,
+        'label': "Total Stats" if stat == 'total' else stat.replace('_', ' ').capitalize(),
+        'names': [pokemon['name'] for pokemon in pokemons],
+        'values': [pokemon[stat] for pokemon in pokemons],
+        'images': [pokemon['image'] for pokemon in pokemons],
+        'next': page['next']
+    })
+
+@app.route('/api/pokemons.json')
+def pokemons_data():
+    """
+    Route to get a page of the registered Pokémon for the table of /show_all, same query string as /show_all.
+    """
+    after, limit = table_query()
+    return json_response(cached_view(f'pokemons.json?{after}&{limit}', lambda: build_pokemons_data(after, limit)))
+
+@app.route('/api/stats.json')
+def stats_data():
+    """
+    Route to get a page of the registered Pokémon with the highest value of a stat for the graph of /show_stats, same query string as /show_stats.
+    """
+    query = stats_query()
+    return json_response(cached_view('stats.json?' + request.query_string.decode('utf-8'), lambda: build_stats_data(*query)))
 
 @app.route('/show_all')
 def show_all():
-    try:
-        df = pd.read_csv('pokemons.csv')
-        table = go.Figure(data=[go.Table(
-            header=dict(values=list(df.columns),
-                        fill_color='paleturquoise',
-                        align='left'),
-            cells=dict(values=[df.name, df.type, df.weakness, df.resistance, df.advantage],
-                       fill_color='lavender',
-                       align='left'))
-        ])
-        table_div = pyo.plot(table, output_type='div', include_plotlyjs=False)
-    except FileNotFoundError:
-        table_div = ""
-    return render_template('show_all.html', table_div=table_div)
+    """
+    Route to show the registered Pokémon a page at a time, the table is drawn by the browser from /api/pokemons.json.
+    """
+    return render('show_all.html', data_url=url_for('pokemons_data', **request.args.to_dict(flat=False)))
 
 @app.route('/show_stats')
 def show_stats():
-    try:
-        df = pd.read_csv('pokemons_stats.csv')  # Try to read the Pokémon data from the CSV file
-        total = df['hp'] + df['attack'] + df['defense'] + df['special_attack'] + df['special_defense'] + df['speed']  # Calculate the total stats of each Pokémon
-        df['total'] = total
-        df = df.sort_values(by=['total'], ascending=False)  # Sort the total stats from highest to lowest
-        df.to_csv('pokemons_stats.csv', index=False)  # Save the DataFrame to the CSV file
-        df = pd.read_csv('pokemons_stats.csv')  # Try to read the Pokémon data from the CSV file
-        total = df['total']  # Get the total stats
-        pokemons_stats = df.to_dict(orient='records')
-
-        # Add a new field to each dictionary in pokemons_stats with the Pokémon's image URL
-        for pokemon in pokemons_stats:
-            pokemon['image'] = pokedex.get_pokemon_image(pokemon['name'])
-
-        stats_fig = go.Figure(data=[go.Bar(x=df['name'], y=total)])  # Create a bar graph using plotly
-        stats_fig.update_layout(title="Your Pokémon team Statistics",  # Set the title and axis labels
-                                    xaxis_title="Pokémon",
-                                    yaxis_title="Total Stats")
-        plot_div = pyo.plot(stats_fig, output_type='div', include_plotlyjs=False)
-
-    except FileNotFoundError:
-        pokemons_stats = []
-        plot_div = ""
-
-    return render_template('show_stats.html', pokemons_stats=pokemons_stats, plot_div=plot_div)
+    """
+    Route to show the registered Pokémon with the highest value of a stat a page at a time, the graph is drawn by the browser from /api/stats.json.
+    The query string can have stat=attack (default total), type=fire,flying, min_<stat>=100, limit=20 and the cursor of the next page.
+    """
+    stat, types, minimums, cursor, limit = stats_query()
+    return render('show_stats.html', stats=STATS, stat=stat, types=types, minimums=minimums, limit=limit,
+                  data_url=url_for('stats_data', **request.args.to_dict(flat=False)))
+
+@app.route('/summary')
+def summary():
+    """
+    Route to show the aggregates of the roster: the number of Pokémon of each type, the range and mean of each stat and the strongest Pokémon.
+    """
+    return cached_view('summary', lambda: render('summary.html', summary=pokedex.roster_summary(), stats=STATS))
 
 @app.route('/clear')
 def clear():
-    try:
-        messages = []
-        os.remove('log.txt')
-        os.remove('pokemons.csv')
-        os.remove('pokemons_stats.csv')
+    messages = []
+    with pokedex.metrics.timer('pokehub_storage_seconds', operation='clear'):
+        cleared = pokedex.storage.clear()  # Delete the registered Pokémon and their stats
+    cleared += pokedex.log.clear()  # Delete the request log
+    cleared += pokedex.invalidate()  # Fetch the cached PokéAPI data again, in the background
+    if cleared:
         messages.append("The files were cleared successfully.")
-    except FileNotFoundError:
+    else:
         messages.append("There are no files to clear.")
-    return render_template('home.html', messages=messages)
+    return render('home.html', messages=messages)
+
+@app.cli.command('snapshot')
+@click.argument('path', default='pokedex.pack')
+def snapshot(path):
+    """
+    Mirror every Pokémon and type of the PokéAPI into a local data pack (flask snapshot [PATH]).
+    """
+    count = pokedex.snapshot(path)
+    if count is not None:
+        print(f"Saved {count} Pokémon to {path}. Start the app with POKEHUB_OFFLINE={path} to work offline.")
 
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,178 @@
+import asyncio  # Importing the asyncio module for running many requests at the same time
+import aiohttp  # Importing the aiohttp library for making non-blocking HTTP requests
+import contextvars  # Importing the contextvars module for keeping the request context in the worker threads
+import time  # Importing the time module for measuring the latency of the requests
+from concurrent.futures import ThreadPoolExecutor  # Importing ThreadPoolExecutor for the lookups that wait for a request
+import requests  # Importing the requests library for its exceptions
+from cache import make_response  # Importing the function that builds requests responses
+from pokemon import PokemonGo  # Importing the PokemonGo class, which keeps the cache, type chart and roster
+
+class AsyncPokemonGo():
+    """
+    Class representing the PokemonGo application for asyncio code.
+    It mirrors the network methods of PokemonGo, sharing the response cache, type chart and roster of a PokemonGo object.
+    Use it as an async context manager: async with AsyncPokemonGo() as api: ...
+    """
+
+    def __init__(self, pokedex=None, max_concurrency=100, timeout=10, retries=3, backoff_factor=0.5):
+        """
+        Constructor method to initialize the AsyncPokemonGo object.
+        max_concurrency is the highest number of lookups waiting for a request at the same time, the requests themselves
+        share the limit of the PokeClient of pokedex (its max_concurrency) with the rest of the application.
+        timeout is the total number of seconds a request may take, failed requests (429, 5xx or connection errors) are retried up to retries times.
+        """
+        self.pokedex = pokedex if pokedex is not None else PokemonGo()
+        self.url = self.pokedex.url  # Base URL for the Pokemon API
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.session = None
+        self.loop = None
+        self.executor = None
+
+    async def __aenter__(self):
+        """
+        Method to open the HTTP session, it must be done inside the running event loop.
+        """
+        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout),
+                                             connector=aiohttp.TCPConnector(limit=self.max_concurrency))  # Keep-alive connection pool
+        self.loop = asyncio.get_running_loop()
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency)  # The threads only wait, for another lookup of the URL or a free slot
+        return self
+
+    async def __aexit__(self, *exc_info):
+        """
+        Method to close the HTTP session.
+        """
+        await self.session.close()
+        self.executor.shutdown(wait=False)
+
+    async def fetch(self, url):
+        """
+        Method to send a GET request to the API, answering it from the response cache when possible.
+        In offline mode every request is answered from the data pack, and with a Refresher expired responses are answered at once
+        and fetched again in the background. A missing response is fetched like in PokemonGo.fetch, sharing the request with
+        the concurrent lookups of the same URL (from this process through the SingleFlight of the PokemonGo object, and from others through its lock file).
+        """
+        cache = self.pokedex.cache
+        start = time.perf_counter()
+        if self.pokedex.pack is not None:
+            response = self.pokedex.pack.response(url, self.url)  # Local disk only, the network is never used
+            self.pokedex.log_requests(response, 'offline', time.perf_counter() - start)
+            return response
+        response, entry = cache.get(url, stale=self.pokedex.refresher is not None)  # Look the URL up in the cache
+        if response is not None:
+            if entry is not None:  # The cached copy expired, answer it anyway and fetch it again in the background
+                self.pokedex.refresher.schedule(url)
+                self.pokedex.log_requests(response, 'stale', time.perf_counter() - start)
+                return response
+            self.pokedex.log_requests(response, 'hit', time.perf_counter() - start)
+            return response  # The cached copy is still fresh, no request is needed
+        # The lookups of the same URL wait for each other in a worker thread, the event loop keeps serving the others
+        context = contextvars.copy_context()  # Keep the route of the request for the metrics
+        response, shared = await self.loop.run_in_executor(self.executor, context.run, self.pokedex.flights.do, url,
+                                                           lambda: self.pokedex.fetch_upstream(url, entry, start, self.send))
+        if shared:
+            self.pokedex.log_requests(response, 'shared', time.perf_counter() - start)
+        return response
+
+    def send(self, url, headers=None):
+        """
+        Method to send a GET request with aiohttp from a worker thread, waiting for its answer.
+        It takes a slot of the PokeClient first, so the whole application never sends more than its max_concurrency requests at the same time.
+        """
+        with self.pokedex.client.slots:
+            return asyncio.run_coroutine_threadsafe(self.request(url, headers), self.loop).result()  # The request runs in the event loop
+
+    async def request(self, url, headers=None):
+        """
+        Method to send a GET request with aiohttp, retrying the failed ones. Returns a requests response.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.session.get(url, headers=headers) as answer:
+                    response = make_response(url, answer.status, await answer.read())  # Build a requests response so the cache and log can be shared with PokemonGo
+                    response.headers.update(answer.headers)
+                if response.status_code not in (429, 500, 502, 503, 504) or attempt == self.retries:
+                    return response
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.retries:
+                    raise requests.exceptions.ConnectionError(e)  # Raise the same error as PokemonGo
+            await asyncio.sleep(self.backoff_factor * 2 ** attempt)  # Wait 0.5s, 1s, 2s... before trying again
+
+    async def fetch_and_save_types_data(self):
+        """
+        Method to fetch and save the Pokemon type data from the API, fetching the details of every type at the same time.
+        """
+        try:
+            response = await self.fetch(self.url + 'type')  # Send a GET request to the API to fetch the type data
+            if response.status_code == 200:  # If the request is successful
+                results = [type for type in response.json()['results'] if type['name'] not in ["unknown", "shadow"]]
+                responses = await asyncio.gather(*[self.fetch(type['url']) for type in results])
+                details = [r.json() if r.status_code == 200 else None for r in responses]
+                self.pokedex.save_types_data(results, details)
+        except requests.exceptions.RequestException as e:
+            print(f"There was a problem obtaining the data: {e}")
+            return None
+
+    async def get_record(self, pokemon):
+        """
+        Method to get the types, stats and image of a specific Pokémon as a PokemonRecord (None if it was not found).
+        The records are shared with the PokemonGo object.
+        """
+        return (await self.lookup_record(pokemon))[0]
+
+    async def lookup_record(self, pokemon):
+        """
+        Method to get the record of a specific Pokémon together with the reason it could not be obtained (see PokemonGo.lookup_record).
+        """
+        record = self.pokedex.records.get(pokemon)
+        if record is not None:
+            return record, None
+        try:
+            response = await self.fetch(self.url + 'pokemon/' + pokemon)  # Send a GET request to fetch the details of the Pokémon
+        except requests.exceptions.RequestException as e:
+            print(f"There was a problem obtaining the data: {e}")
+            return None, f"the PokéAPI could not be reached ({type(e).__name__})"
+        return self.pokedex.parse_record(pokemon, response)
+
+    async def get_pokemon(self, pokemon):
+        """
+        Method to get the details of a specific Pokémon from the API, with only the fields the application uses (see PokemonRecord.to_data).
+        """
+        record = await self.get_record(pokemon)
+        return record.to_data() if record is not None else None
+
+    async def get_pokemon_info(self, name):
+        """
+        Method to get the pokemon stats.
+        """
+        record = await self.get_record(name.lower())  # Get the pokemon data
+        if record is None:
+            print(f"No information was found for the Pokémon {name.capitalize()}.")
+            return None
+        return record.stats_dict()  # Get the pokemon stats
+
+    async def resolve(self, pokemon):
+        """
+        Method to fetch a specific Pokémon once and derive all of its details from that single response.
+        """
+        record, error = await self.lookup_record(pokemon)
+        if record is not None and self.pokedex.chart is None:
+            await asyncio.to_thread(self.pokedex.type_chart)  # Load the type chart without blocking the event loop
+        return self.pokedex.resolve_record(pokemon, record, error)
+
+    async def basic_info(self, pokemon):
+        """
+        Method to get basic information about a specific Pokémon.
+        """
+        return await self.resolve(pokemon)
+
+    async def resolve_many(self, names):
+        """
+        Method to resolve several Pokémon at the same time.
+        Returns a dictionary with the details of each Pokémon.
+        """
+        infos = await asyncio.gather(*[self.resolve(name) for name in names])
+        return dict(zip(names, infos))
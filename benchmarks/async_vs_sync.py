@@ -0,0 +1,91 @@
+"""
+Benchmark comparing the requests per second of PokemonGo (synchronous) and AsyncPokemonGo against the local stub API.
+Run it from the root of the project with: python -m benchmarks.async_vs_sync --count 300 --latency 0.05
+"""
+import argparse  # Importing the argparse module for the command line options
+import asyncio  # Importing the asyncio module for running the async benchmark
+import json  # Importing the json module for printing the results
+import os  # Importing the os module for working in a temporary directory
+import tempfile  # Importing the tempfile module for a clean cache and roster on every run
+import time  # Importing the time module for measuring the throughput
+from concurrent.futures import ThreadPoolExecutor  # Importing ThreadPoolExecutor for the threaded benchmark
+from async_pokemon import AsyncPokemonGo
+from cache import ResponseCache
+from client import PokeClient
+from pokemon import PokemonGo
+from storage import RosterStore
+from benchmarks import stub_api
+
+def new_pokedex(url, workdir, name, pool_size=10):
+    """
+    Function to create a PokemonGo object with an empty cache and roster, so every lookup reaches the stub API.
+    """
+    return PokemonGo(url=url, cache=ResponseCache(os.path.join(workdir, name + '.sqlite')),
+                     storage=RosterStore(os.path.join(workdir, name + '.db')),
+                     client=PokeClient(pool_size=pool_size, max_concurrency=pool_size))
+
+def run_sync(url, workdir, names):
+    """
+    Function to resolve the names one after another, like a single synchronous Flask worker.
+    """
+    pokedex = new_pokedex(url, workdir, 'sync')
+    pokedex.warmup()
+    start = time.perf_counter()
+    for name in names:
+        pokedex.resolve(name)
+    return time.perf_counter() - start
+
+def run_threads(url, workdir, names, threads):
+    """
+    Function to resolve the names with a pool of threads, like a threaded synchronous worker.
+    """
+    pokedex = new_pokedex(url, workdir, 'threads', pool_size=threads)
+    pokedex.warmup()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(pokedex.resolve, names))
+    return time.perf_counter() - start
+
+def run_async(url, workdir, names, concurrency):
+    """
+    Function to resolve the names with AsyncPokemonGo, keeping up to concurrency lookups in flight.
+    """
+    pokedex = new_pokedex(url, workdir, 'async')
+    pokedex.warmup()
+
+    async def main():
+        async with AsyncPokemonGo(pokedex, max_concurrency=concurrency) as api:
+            start = time.perf_counter()
+            await api.resolve_many(names)
+            return time.perf_counter() - start
+
+    return asyncio.run(main())
+
+def main():
+    """
+    Function to run the benchmark and print the results as JSON.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=300, help='number of distinct Pokémon to resolve')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds the stub API waits before answering')
+    parser.add_argument('--threads', type=int, default=8, help='threads of the threaded benchmark')
+    parser.add_argument('--concurrency', type=int, default=100, help='lookups in flight in the async benchmark')
+    args = parser.parse_args()
+
+    server, state, url = stub_api.serve(latency=args.latency, count=max(args.count, 1010))
+    names = [stub_api.species(i)[0] for i in range(1, args.count + 1)]
+    results = {'count': args.count, 'latency': args.latency}
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)  # PokemonGo writes types.csv and log.jsonl in the working directory
+        new_pokedex(url, workdir, 'types').warmup()  # Create types.csv once, the benchmarks only measure the lookups
+        for mode, run in [('sync', lambda: run_sync(url, workdir, names)),
+                          ('threads', lambda: run_threads(url, workdir, names, args.threads)),
+                          ('async', lambda: run_async(url, workdir, names, args.concurrency))]:
+            state.calls = 0
+            seconds = run()
+            results[mode] = {'seconds': round(seconds, 3), 'requests_per_second': round(args.count / seconds, 1), 'upstream_calls': state.calls}
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
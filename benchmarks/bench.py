@@ -0,0 +1,206 @@
+"""
+Benchmark suite of the registration, listing and stats paths of PokéHub against the local stub API.
+Every roster size runs in its own process, so the peak memory of each one is measured separately.
+Run it from the root of the project with: python -m benchmarks.bench --sizes 10 1000 100000 --output bench.json
+Compare two runs (eg. of two commits) with: python -m benchmarks.bench --compare before.json after.json
+"""
+import argparse  # Importing the argparse module for the command line options
+import datetime  # Importing the datetime module for the date of the run
+import json  # Importing the json module for the results file
+import os  # Importing the os module for working in a temporary directory
+import platform  # Importing the platform module for describing the machine
+import resource  # Importing the resource module for the peak memory (Linux and macOS only)
+import statistics  # Importing the statistics module for the mean latency
+import subprocess  # Importing the subprocess module for running every roster size in its own process
+import sys  # Importing the sys module for the Python executable
+import tempfile  # Importing the tempfile module for a clean cache and roster on every run
+import time  # Importing the time module for measuring the latency
+
+def percentile(samples, fraction):
+    """
+    Function to get a percentile of a list of samples, eg. fraction=0.99 for the p99 (nearest rank).
+    """
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+def summary(samples, seconds, upstream_calls):
+    """
+    Function to summarize the latencies (in seconds) of a scenario.
+    """
+    return {
+        'operations': len(samples),
+        'throughput_per_second': round(len(samples) / seconds, 1) if seconds else None,
+        'p50_ms': round(percentile(samples, 0.5) * 1000, 3),
+        'p99_ms': round(percentile(samples, 0.99) * 1000, 3),
+        'mean_ms': round(statistics.mean(samples) * 1000, 3),
+        'upstream_calls': upstream_calls
+    }
+
+def measure(state, operations):
+    """
+    Function to run a list of operations (functions without arguments) one after another and summarize their latencies.
+    """
+    calls = state.calls
+    samples = []
+    start = time.perf_counter()
+    for operation in operations:
+        began = time.perf_counter()
+        operation()
+        samples.append(time.perf_counter() - began)
+    return summary(samples, time.perf_counter() - start, state.calls - calls)
+
+def seed_roster(pokedex, size):
+    """
+    Function to fill the roster with size Pokémon without using the network, from the species of the stub API.
+    """
+    from benchmarks import stub_api
+    rows = []
+    for i in range(size):
+        data = stub_api.pokemon_detail(i % 1010 + 1, 0)
+        name = f"bench-{i}"
+        info = pokedex.resolve_data(name, data)
+        rows.append((pokedex.pokemon_row(name, info), pokedex.stats_row(name, info)))
+    for start in range(0, len(rows), 10000):
+        pokedex.storage.register_many(rows[start:start + 10000])  # One transaction per 10k Pokémon
+
+def run_size(size, latency, count, padding):
+    """
+    Function to benchmark one roster size, returning the results of every scenario.
+    It must run in a fresh process, see main.
+    """
+    from benchmarks import stub_api
+    server, state, url = stub_api.serve(latency=latency, padding=padding)
+    workdir = tempfile.mkdtemp(prefix='pokehub-bench-')
+    os.chdir(workdir)  # PokemonGo writes its cache, roster, types.csv and log in the working directory
+    os.environ['POKEHUB_API_URL'] = url
+    import app  # Imported here so the application uses the stub API and the temporary directory
+    app.pokedex.warmup()
+    client = app.app.test_client()
+    pokedex = app.pokedex
+    started = time.perf_counter()
+    seed_roster(pokedex, size)
+    results = {'seed_seconds': round(time.perf_counter() - started, 3)}
+    new_names = [stub_api.species(i)[0] for i in range(200, 200 + count)]  # Species that are not in the roster yet
+
+    def fresh_view(path):
+        """
+        Function to request a page after forgetting the rendered views, as after a registration.
+        """
+        app.views.clear()
+        return client.get(path)
+
+    etags = {}
+
+    def revalidate(path):
+        """
+        Function to request a page again with the ETag of the current roster, as a browser that already has it.
+        """
+        if path not in etags:
+            etags[path] = client.get(path).headers['ETag']  # Only the first operation asks for it, the roster doesn't change anymore
+        return client.get(path, headers={'If-None-Match': etags[path]})
+
+    scenarios = {
+        'add_new': [lambda name=name: client.post('/add', data={'pokemon': name}) for name in new_names],  # Cache miss, one upstream call each
+        'add_cached': [lambda name=name: client.post('/add', data={'pokemon': name}) for name in new_names],  # Cache hit and already registered
+        'show_all': [lambda: fresh_view('/show_all') for _ in range(count)],
+        'show_all_cached': [lambda: client.get('/show_all') for _ in range(count)],
+        'show_stats': [lambda: fresh_view('/show_stats') for _ in range(count)],
+        'show_stats_cached': [lambda: client.get('/show_stats') for _ in range(count)],
+        'stats_json': [lambda: fresh_view('/api/stats.json') for _ in range(count)],
+        'stats_json_cached': [lambda: client.get('/api/stats.json', headers={'Accept-Encoding': 'gzip'}) for _ in range(count)],
+        'stats_json_not_modified': [lambda: revalidate('/api/stats.json') for _ in range(count)],  # Answered with 304
+        'stats_json_filtered': [lambda: fresh_view('/api/stats.json?stat=speed&type=fire&min_hp=50') for _ in range(count)],
+        'pokemons_json': [lambda: fresh_view('/api/pokemons.json') for _ in range(count)],
+        'summary': [lambda: fresh_view('/summary') for _ in range(count)],
+        'summary_json': [lambda: client.get('/api/v1/summary') for _ in range(count)],
+        'resolve_cached': [lambda name=name: pokedex.resolve(name) for name in new_names],
+        'query_stats_top20': [lambda: pokedex.query_stats('total', 20) for _ in range(count)],
+        'analyze_team': [lambda: pokedex.analyze_team(new_names[:6]) for _ in range(count)],
+    }
+    for name, operations in scenarios.items():
+        results[name] = measure(state, operations)
+    server.shutdown()
+    results['peak_rss_mb'] = round(peak_rss() / 1024 / 1024, 1)
+    return results
+
+def peak_rss():
+    """
+    Function to get the peak resident memory of the current process in bytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # Linux reports kilobytes, macOS bytes
+
+def git_commit():
+    """
+    Function to get the commit being benchmarked, so runs of different commits can be told apart.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(before, after):
+    """
+    Function to print the change of the p50 and p99 latencies of every scenario between two results files.
+    """
+    with open(before, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(after, encoding='utf-8') as f:
+        new = json.load(f)
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    for size, results in new['results'].items():
+        for scenario, result in results.items():
+            previous = old['results'].get(size, {}).get(scenario)
+            if not isinstance(result, dict) or not isinstance(previous, dict):
+                continue
+            changes = [f"{key} {previous[key]} -> {result[key]} ({(result[key] / previous[key] - 1) * 100:+.0f}%)"
+                       for key in ('p50_ms', 'p99_ms') if previous.get(key)]
+            print(f"{size:>7} {scenario:<20} " + '  '.join(changes))
+
+def main():
+    """
+    Function to run the benchmark of every roster size in its own process and save the results as JSON.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 100000], help='roster sizes to benchmark')
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds the stub API waits before answering')
+    parser.add_argument('--count', type=int, default=50, help='operations per scenario')
+    parser.add_argument('--padding', type=int, default=80, help='moves per Pokémon in the stub answers, 80 gives about 12 KB like the real API')
+    parser.add_argument('--output', default='bench.json', help='file where the results are saved')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='compare two results files instead of running the benchmark')
+    parser.add_argument('--run-size', type=int, help=argparse.SUPPRESS)  # Used by the child processes
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.run_size is not None:
+        json.dump(run_size(args.run_size, args.latency, args.count, args.padding), sys.stdout)
+        return
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    report = {
+        'commit': git_commit(),
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': {'latency': args.latency, 'count': args.count, 'padding': args.padding},
+        'results': {}
+    }
+    for size in args.sizes:
+        print(f"Benchmarking a roster of {size} Pokémon...", file=sys.stderr)
+        child = subprocess.run([sys.executable, '-m', 'benchmarks.bench', '--run-size', str(size), '--latency', str(args.latency),
+                                '--count', str(args.count), '--padding', str(args.padding)],
+                               cwd=root, env=dict(os.environ, PYTHONPATH=root), capture_output=True, text=True)
+        if child.returncode != 0:
+            print(child.stderr, file=sys.stderr)
+            sys.exit(f"The benchmark of {size} Pokémon failed.")
+        report['results'][str(size)] = json.loads(child.stdout.strip().splitlines()[-1])  # The last line is the JSON, the application may print before it
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
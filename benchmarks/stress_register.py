@@ -0,0 +1,109 @@
+"""
+Stress test of registering Pokémon from several processes at once against the local stub API.
+Every process registers an overlapping share of the names, mixing PokemonGo.register and PokemonGo.register_many,
+and at the end the roster must have each name exactly once, with its stats, columns and aggregates.
+Run it from the root of the project with: python -m benchmarks.stress_register --processes 8 --count 300 --adds 800
+"""
+import argparse  # Importing the argparse module for the command line options
+import json  # Importing the json module for printing the results
+import multiprocessing  # Importing the multiprocessing module for registering from several processes
+import os  # Importing the os module for working in a temporary directory
+import random  # Importing the random module for shuffling the registrations of every process
+import sys  # Importing the sys module for the exit status
+import tempfile  # Importing the tempfile module for a clean cache and roster on every run
+import time  # Importing the time module for measuring the run
+from cache import ResponseCache
+from client import PokeClient
+from pokemon import PokemonGo
+from storage import RosterStore
+from benchmarks import stub_api
+
+def new_pokedex(url, workdir):
+    """
+    Function to create a PokemonGo object using the cache and roster shared by every process.
+    """
+    return PokemonGo(url=url, cache=ResponseCache(os.path.join(workdir, 'http_cache.sqlite')),
+                     storage=RosterStore(os.path.join(workdir, 'pokehub.db')), client=PokeClient())
+
+def worker(url, workdir, names, seed, start):
+    """
+    Function run by every process: registers its names one at a time or in small batches, in a random order.
+    Returns the number of Pokémon this process saved.
+    """
+    os.chdir(workdir)  # PokemonGo writes types.csv and log.jsonl in the working directory
+    pokedex = new_pokedex(url, workdir)
+    generator = random.Random(seed)
+    names = list(names)
+    generator.shuffle(names)
+    start.wait()  # Every process starts registering at the same time
+    saved = 0
+    while names:
+        if generator.random() < 0.5:
+            saved += pokedex.register(names.pop())
+        else:
+            size = generator.randint(2, 20)  # Small teams, like the bulk form
+            batch, names = names[:size], names[size:]
+            saved += len(pokedex.register_many(batch)['added'])
+    return saved
+
+def check(workdir, names):
+    """
+    Function to compare the roster with the names that were registered. Returns the list of problems found.
+    """
+    storage = RosterStore(os.path.join(workdir, 'pokehub.db'))
+    pokemons = [row['name'] for row in storage.pokemons()]
+    stats = [row['name'] for row in storage.stats()]
+    problems = []
+    for label, saved in [('pokemons', pokemons), ('pokemons_stats', stats)]:
+        if len(saved) != len(set(saved)):
+            problems.append(f"{label} has {len(saved) - len(set(saved))} repeated names")
+        if set(saved) != set(names):
+            problems.append(f"{label} is missing {len(set(names) - set(saved))} names and has {len(set(saved) - set(names))} unexpected ones")
+    columns = storage.stats_columns()
+    if sorted(columns.strings('names')) != sorted(names):
+        problems.append(f"the columns have {columns.meta['rows']} rows instead of {len(names)}")
+    summary = storage.summary()
+    if summary['pokemons'] != len(names):
+        problems.append(f"the summary counts {summary['pokemons']} Pokémon instead of {len(names)}")
+    if summary['stats'].get('total', {}).get('count', len(names)) != len(names):
+        problems.append(f"the stat aggregates count {summary['stats']['total']['count']} Pokémon instead of {len(names)}")
+    return problems
+
+def main():
+    """
+    Function to run the stress test, print the results as JSON and exit with status 1 if any registration was lost or repeated.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--processes', type=int, default=8, help='processes registering at the same time')
+    parser.add_argument('--count', type=int, default=300, help='number of distinct Pokémon to register')
+    parser.add_argument('--adds', type=int, default=800, help='registrations sent by all the processes together')
+    parser.add_argument('--latency', type=float, default=0.005, help='seconds the stub API waits before answering')
+    args = parser.parse_args()
+
+    server, state, url = stub_api.serve(latency=args.latency, count=max(args.count, 1010))
+    names = [stub_api.species(i)[0] for i in range(1, args.count + 1)]
+    shares = [[names[(p * args.adds // args.processes + i) % len(names)] for i in range(args.adds // args.processes)]
+              for p in range(args.processes)]  # Consecutive slices of the names repeated round, so the processes overlap
+    context = multiprocessing.get_context('spawn')  # A fresh interpreter per process, like separate workers of the web application
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        new_pokedex(url, workdir).warmup()  # Create types.csv and the roster once, the processes only register
+        start = context.Manager().Event()
+        with context.Pool(args.processes) as pool:
+            results = pool.starmap_async(worker, [(url, workdir, share, seed, start) for seed, share in enumerate(shares)])
+            time.sleep(1)  # Let every process open the cache and roster before they start
+            began = time.perf_counter()
+            start.set()
+            saved = sum(results.get())
+        seconds = time.perf_counter() - began
+        expected = sorted(set(name for share in shares for name in share))
+        problems = check(workdir, expected)
+    server.shutdown()
+    if saved != len(expected):
+        problems.append(f"the processes reported {saved} saved Pokémon instead of {len(expected)}")
+    print(json.dumps({'processes': args.processes, 'adds': args.processes * len(shares[0]), 'names': len(expected),
+                      'saved': saved, 'seconds': round(seconds, 3), 'upstream_calls': state.calls, 'problems': problems}, indent=2))
+    sys.exit(1 if problems else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+"""
+Local stub of the PokéAPI endpoints used by PokéHub, for benchmarks and manual testing.
+Run it with: python benchmarks/stub_api.py --port 8765 --latency 0.05
+"""
+import argparse  # Importing the argparse module for the command line options
+import collections  # Importing the collections module for counting the requests of each path
+import hashlib  # Importing the hashlib module for deterministic fake species and ETags
+import json  # Importing the json module for encoding the answers
+import threading  # Importing the threading module for running the server in the background
+import time  # Importing the time module for the simulated latency
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Importing the HTTP server classes
+from urllib.parse import urlsplit, parse_qs  # Importing the URL parsing functions
+
+TYPE_NAMES = ['normal', 'fighting', 'flying', 'poison', 'ground', 'rock', 'bug', 'ghost', 'steel',
+              'fire', 'water', 'grass', 'electric', 'psychic', 'ice', 'dragon', 'dark', 'fairy']
+
+# Attacking type -> (double damage to, half damage to, no damage to)
+CHART = {
+    'normal': ([], ['rock', 'steel'], ['ghost']),
+    'fire': (['grass', 'ice', 'bug', 'steel'], ['fire', 'water', 'rock', 'dragon'], []),
+    'water': (['fire', 'ground', 'rock'], ['water', 'grass', 'dragon'], []),
+    'electric': (['water', 'flying'], ['electric', 'grass', 'dragon'], ['ground']),
+    'grass': (['water', 'ground', 'rock'], ['fire', 'grass', 'poison', 'flying', 'bug', 'dragon', 'steel'], []),
+    'ice': (['grass', 'ground', 'flying', 'dragon'], ['fire', 'water', 'ice', 'steel'], []),
+    'fighting': (['normal', 'ice', 'rock', 'dark', 'steel'], ['poison', 'flying', 'psychic', 'bug', 'fairy'], ['ghost']),
+    'poison': (['grass', 'fairy'], ['poison', 'ground', 'rock', 'ghost'], ['steel']),
+    'ground': (['fire', 'electric', 'poison', 'rock', 'steel'], ['grass', 'bug'], ['flying']),
+    'flying': (['grass', 'fighting', 'bug'], ['electric', 'rock', 'steel'], []),
+    'psychic': (['fighting', 'poison'], ['psychic', 'steel'], ['dark']),
+    'bug': (['grass', 'psychic', 'dark'], ['fire', 'fighting', 'poison', 'flying', 'ghost', 'steel', 'fairy'], []),
+    'rock': (['fire', 'ice', 'flying', 'bug'], ['fighting', 'ground', 'steel'], []),
+    'ghost': (['psychic', 'ghost'], ['dark'], ['normal']),
+    'dragon': (['dragon'], ['steel'], ['fairy']),
+    'dark': (['psychic', 'ghost'], ['fighting', 'dark', 'fairy'], []),
+    'steel': (['ice', 'rock', 'fairy'], ['fire', 'water', 'electric', 'steel'], []),
+    'fairy': (['fighting', 'dragon', 'dark'], ['fire', 'poison', 'steel'], []),
+}
+
+KNOWN = {
+    'bulbasaur': (1, ['grass', 'poison'], [45, 49, 49, 65, 65, 45]),
+    'charmander': (4, ['fire'], [39, 52, 43, 60, 50, 65]),
+    'squirtle': (7, ['water'], [44, 48, 65, 50, 64, 43]),
+    'pikachu': (25, ['electric'], [35, 55, 40, 50, 50, 90]),
+    'gengar': (94, ['ghost', 'poison'], [60, 65, 60, 130, 75, 110]),
+    'mewtwo': (150, ['psychic'], [106, 110, 90, 154, 90, 130]),
+}
+
+
+def ref(kind, name, ident):
+    """
+    Function to create a named reference to another resource, like the ones returned by the PokéAPI.
+    """
+    return {'name': name, 'url': f'{{base}}{kind}/{ident}/'}
+
+
+def type_detail(name, count=1010):
+    """
+    Function to create the /type/{name} answer of a type, listing the species of that type among the first count ones.
+    """
+    ident = TYPE_NAMES.index(name) + 1
+    to2, to05, to0 = CHART[name]
+    frm2 = [a for a in TYPE_NAMES if name in CHART[a][0]]
+    frm05 = [a for a in TYPE_NAMES if name in CHART[a][1]]
+    frm0 = [a for a in TYPE_NAMES if name in CHART[a][2]]
+    relations = {
+        'double_damage_from': [ref('type', t, TYPE_NAMES.index(t) + 1) for t in frm2],
+        'half_damage_from': [ref('type', t, TYPE_NAMES.index(t) + 1) for t in frm05],
+        'no_damage_from': [ref('type', t, TYPE_NAMES.index(t) + 1) for t in frm0],
+        'double_damage_to': [ref('type', t, TYPE_NAMES.index(t) + 1) for t in to2],
+        'half_damage_to': [ref('type', t, TYPE_NAMES.index(t) + 1) for t in to05],
+        'no_damage_to': [ref('type', t, TYPE_NAMES.index(t) + 1) for t in to0],
+    }
+    return {'id': ident, 'name': name, 'damage_relations': relations,
+            'pokemon': [{'pokemon': ref('pokemon', pokemon, i), 'slot': types.index(name) + 1}
+                        for i, (pokemon, types, _) in ((i, species(i)) for i in range(1, count + 1)) if name in types]}
+
+
+def species(ident):
+    """
+    Function to get the (name, types, stats) of a species id, the unknown ones are made up deterministically.
+    """
+    for name, (i, types, stats) in KNOWN.items():
+        if i == ident:
+            return name, types, stats
+    h = hashlib.sha1(str(ident).encode()).digest()
+    types = [TYPE_NAMES[h[0] % 18]]
+    if h[1] % 2:
+        second = TYPE_NAMES[h[2] % 18]
+        if second != types[0]:
+            types.append(second)
+    stats = [20 + h[3 + i] % 140 for i in range(6)]
+    return f'mon-{ident}', types, stats
+
+
+def pokemon_detail(ident, padding):
+    """
+    Function to create the /pokemon/{name} answer of a species, padding adds moves to reach a realistic payload size.
+    """
+    name, types, stats = species(ident)
+    stat_names = ['hp', 'attack', 'defense', 'special-attack', 'special-defense', 'speed']
+    return {
+        'id': ident,
+        'name': name,
+        'types': [{'slot': i + 1, 'type': ref('type', t, TYPE_NAMES.index(t) + 1)} for i, t in enumerate(types)],
+        'stats': [{'base_stat': s, 'effort': 0, 'stat': ref('stat', n, j + 1)} for j, (n, s) in enumerate(zip(stat_names, stats))],
+        'sprites': {'front_default': f'https://img.example/{ident}.png', 'back_default': None},
+        'moves': [{'move': ref('move', f'move-{m}', m), 'version_group_details': [{'level_learned_at': m % 50}]} for m in range(padding)],
+    }
+
+
+class StubState():
+    """
+    Class representing the settings and counters of the stub server.
+    """
+
+    def __init__(self, count=1010, latency=0.0, padding=80):
+        """
+        Constructor method to initialize the StubState object.
+        count is the number of species, latency the seconds waited before every answer and padding the number of moves per species.
+        """
+        self.count = count
+        self.latency = latency
+        self.padding = padding
+        self.calls = 0  # Number of requests received
+        self.paths = collections.Counter()  # Number of requests received for each path, eg. paths['/api/v2/pokemon/pikachu']
+        self.fail_next = 0  # Number of upcoming requests answered with 503
+        self.lock = threading.Lock()
+        self.names = {}
+        for i in range(1, count + 1):
+            self.names[species(i)[0]] = i
+
+
+def make_handler(state):
+    """
+    Function to create the request handler class of a stub server.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # Keep connections alive like the real API
+        disable_nagle_algorithm = True  # Headers and body are written separately, don't delay the body
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            with state.lock:
+                state.calls += 1
+                state.paths[urlsplit(self.path).path] += 1
+            if state.latency:
+                time.sleep(state.latency)
+            with state.lock:
+                failing = state.fail_next > 0
+                if failing:
+                    state.fail_next -= 1
+            if failing:
+                self.send_response(503)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            parts = urlsplit(self.path)
+            path = parts.path.strip('/').split('/')
+            query = parse_qs(parts.query)
+            base = f'http://{self.headers.get("Host")}/api/v2/'
+            body = None
+            if path[:2] == ['api', 'v2'] and len(path) >= 3:
+                kind, rest = path[2], path[3:]
+                if kind == 'type' and not rest:
+                    results = [ref('type', t, i + 1) for i, t in enumerate(TYPE_NAMES)]
+                    results += [ref('type', 'unknown', 10001), ref('type', 'shadow', 10002)]
+                    body = {'count': len(results), 'results': results}
+                elif kind == 'type' and rest:
+                    key = rest[0]
+                    name = TYPE_NAMES[int(key) - 1] if key.isdigit() and int(key) <= 18 else key
+                    if name in CHART:
+                        body = type_detail(name, state.count)
+                    elif key in ('10001', '10002', 'unknown', 'shadow'):
+                        body = {'id': int(key) if key.isdigit() else 10001, 'name': 'unknown', 'damage_relations': {k: [] for k in ('double_damage_from', 'half_damage_from', 'no_damage_from', 'double_damage_to', 'half_damage_to', 'no_damage_to')}}
+                elif kind == 'pokemon' and not rest:
+                    limit = int(query.get('limit', ['20'])[0])
+                    offset = int(query.get('offset', ['0'])[0])
+                    ids = range(offset + 1, min(offset + limit, state.count) + 1)
+                    body = {'count': state.count, 'results': [ref('pokemon', species(i)[0], i) for i in ids]}
+                elif kind == 'pokemon' and rest:
+                    key = rest[0]
+                    ident = int(key) if key.isdigit() else state.names.get(key)
+                    if ident and 1 <= ident <= state.count:
+                        body = pokemon_detail(ident, state.padding)
+            if body is None:
+                payload = b'Not Found'
+                self.send_response(404)
+                self.send_header('Content-Type', 'text/plain')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+            payload = json.dumps(body).replace('{base}', base).encode()
+            etag = '"' + hashlib.md5(payload).hexdigest() + '"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return Handler
+
+
+def serve(port=0, **kwargs):
+    """
+    Function to start the stub server in a background thread, returning (server, state, base_url).
+    """
+    state = StubState(**kwargs)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f'http://127.0.0.1:{server.server_address[1]}/api/v2/'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0)
+    args = parser.parse_args()
+    server, state, url = serve(args.port, latency=args.latency)
+    print(f'Stub PokéAPI listening on {url}')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
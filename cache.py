@@ -0,0 +1,224 @@
+import sqlite3  # Importing the sqlite3 module for storing the cached responses on disk
+import threading  # Importing the threading module for per-thread database connections
+import time  # Importing the time module for expiry and access timestamps
+from urllib.parse import urlsplit  # Importing urlsplit for finding the endpoint of a URL
+import requests  # Importing the requests library to rebuild responses from the cache
+
+DEFAULT_TTLS = {
+    'pokemon': 7 * 24 * 60 * 60,  # Pokémon details rarely change, keep them for a week
+    'type': 30 * 24 * 60 * 60,  # The type chart almost never changes, keep it for a month
+}
+TOUCH_INTERVAL = 60 * 60  # Seconds between two updates of the last access of a response, plenty for choosing which ones to evict
+
+def make_response(url, status_code, body, content_type=None, etag=None):
+    """
+    Function to build a requests Response object from its parts, for answers that don't come from the network.
+    """
+    response = requests.models.Response()
+    response.status_code = status_code
+    response._content = bytes(body)
+    response.url = url
+    response.encoding = 'utf-8'
+    if content_type:
+        response.headers['Content-Type'] = content_type
+    if etag:
+        response.headers['ETag'] = etag
+    return response
+
+class ResponseCache():
+    """
+    Class representing an on-disk cache of PokéAPI responses stored in a SQLite database.
+    """
+
+    def __init__(self, path='http_cache.sqlite', max_bytes=64 * 1024 * 1024, ttls=None, default_ttl=24 * 60 * 60, synchronous='NORMAL', touch_interval=TOUCH_INTERVAL):
+        """
+        Constructor method to initialize the ResponseCache object.
+        max_bytes is the byte budget of the cached bodies, the least recently used responses are evicted above it.
+        ttls maps an endpoint name (eg. 'pokemon' or 'type') to the number of seconds its responses stay fresh.
+        synchronous is the SQLite fsync policy like in RosterStore, losing the last responses in a power cut only costs new requests.
+        touch_interval is the number of seconds a hit waits before recording the access again, so most hits don't write.
+        """
+        self.path = path
+        self.synchronous = synchronous
+        self.touch_interval = touch_interval
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.hits = 0  # Number of requests answered from the cache without using the network
+        self.misses = 0  # Number of requests that had to use the network
+        self.revalidations = 0  # Number of stale responses confirmed unchanged by the API
+        self.stale = 0  # Number of expired responses answered while they are refreshed in the background
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.ready = False  # The table is created by the first connection, so creating the cache doesn't touch the disk
+
+    def create_tables(self, db):
+        """
+        Method to create the table of the cached responses if it doesn't exist yet, once per process.
+        """
+        with self.lock:
+            if self.ready:
+                return
+            with db:
+                db.execute("""CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY,
+                    status INTEGER NOT NULL,
+                    body BLOB NOT NULL,
+                    content_type TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    size INTEGER NOT NULL,
+                    stored_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )""")
+                db.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+            self.ready = True
+
+    def connection(self):
+        """
+        Method to get the database connection of the current thread.
+        """
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)  # Wait for other processes instead of failing when the database is busy
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")  # Let readers and a writer use the database at the same time
+            db.execute(f"PRAGMA synchronous={self.synchronous}")
+            if not self.ready:
+                self.create_tables(db)
+            self.local.db = db
+        return db
+
+    def ttl(self, url):
+        """
+        Method to get the number of seconds a response of the given URL stays fresh.
+        """
+        path = urlsplit(url).path.rstrip('/').split('/')
+        for segment in path:
+            if segment in self.ttls:
+                return self.ttls[segment]  # Use the TTL of the first endpoint name found in the path
+        return self.default_ttl
+
+    def count(self, field):
+        """
+        Method to increase one of the hit/miss counters.
+        """
+        with self.lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def get(self, url, stale=False):
+        """
+        Method to look up a URL in the cache.
+        Returns a tuple (response, entry): response is set when the cached copy is still fresh,
+        otherwise entry holds the stale copy (or None) that can be revalidated with conditional_headers.
+        With stale=True an expired copy is returned as well, as (response, entry), so it can be answered while it is refreshed.
+        """
+        db = self.connection()
+        entry = db.execute("SELECT * FROM responses WHERE url = ?", (url,)).fetchone()
+        fresh = entry is not None and time.time() - entry['stored_at'] < self.ttl(url)
+        if fresh or (stale and entry is not None):
+            now = time.time()
+            if now - entry['accessed_at'] >= self.touch_interval:  # Eviction only needs a rough order, recent accesses aren't written again
+                with db:
+                    db.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (now, url))  # Mark the entry as recently used
+            if fresh:
+                self.count('hits')
+                return self.to_response(entry), None
+            self.count('stale')
+            return self.to_response(entry), entry
+        self.count('misses')
+        return None, entry
+
+    def conditional_headers(self, entry):
+        """
+        Method to get the headers that ask the API to only send a response if it changed since the cached copy.
+        """
+        headers = {}
+        if entry is not None:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def revalidate(self, url, entry, response):
+        """
+        Method to refresh a stale entry after the API answered 304 Not Modified, returning the cached response.
+        """
+        now = time.time()
+        with self.connection() as db:
+            db.execute("UPDATE responses SET stored_at = ?, accessed_at = ?, etag = COALESCE(?, etag) WHERE url = ?",
+                       (now, now, response.headers.get('ETag'), url))
+        self.count('revalidations')
+        return self.to_response(entry)
+
+    def store(self, url, response):
+        """
+        Method to save a successful response in the cache and evict old entries above the byte budget.
+        """
+        if response.status_code != 200:
+            return  # Only successful responses are cached
+        body = response.content
+        now = time.time()
+        with self.connection() as db:
+            db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                       (url, response.status_code, body, response.headers.get('Content-Type'),
+                        response.headers.get('ETag'), response.headers.get('Last-Modified'), len(body), now, now))
+        self.evict()
+
+    def evict(self):
+        """
+        Method to delete the least recently used responses until the cache fits in its byte budget.
+        """
+        with self.connection() as db:
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            expired = []
+            for row in db.execute("SELECT url, size FROM responses ORDER BY accessed_at"):  # Oldest accessed first
+                if total <= self.max_bytes:
+                    break
+                expired.append((row['url'],))
+                total -= row['size']
+            db.executemany("DELETE FROM responses WHERE url = ?", expired)
+
+    def to_response(self, entry):
+        """
+        Method to rebuild a requests Response object from a cached entry.
+        """
+        return make_response(entry['url'], entry['status'], entry['body'], entry['content_type'], entry['etag'])
+
+    def expired(self, limit=100):
+        """
+        Method to get the URLs of the expired responses, the oldest first, at most limit of them.
+        """
+        now = time.time()
+        urls = []
+        for row in self.connection().execute("SELECT url, stored_at FROM responses ORDER BY stored_at"):
+            if len(urls) >= limit:
+                break
+            if now - row['stored_at'] >= self.ttl(row['url']):
+                urls.append(row['url'])
+        return urls
+
+    def invalidate(self):
+        """
+        Method to mark every cached response as expired, keeping them so they can still be answered and revalidated with their ETag.
+        Returns the number of responses.
+        """
+        with self.connection() as db:
+            return db.execute("UPDATE responses SET stored_at = 0").rowcount
+
+    def clear(self):
+        """
+        Method to delete every cached response.
+        """
+        with self.connection() as db:
+            db.execute("DELETE FROM responses")
+
+    def stats(self):
+        """
+        Method to get the hit/miss counters and the size of the cache.
+        """
+        entries, size = self.connection().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'revalidations': self.revalidations, 'stale': self.stale, 'entries': entries, 'bytes': size}
@@ -0,0 +1,39 @@
+import threading  # Importing the threading module for limiting the number of requests in flight
+import requests  # Importing the requests library for making HTTP requests
+from requests.adapters import HTTPAdapter  # Importing HTTPAdapter for the connection pool
+from urllib3.util.retry import Retry  # Importing Retry for retrying failed requests
+
+class PokeClient():
+    """
+    Class representing the HTTP client used to talk to the PokéAPI.
+    It keeps connections alive in a pool, retries rate limited and failed requests, and never waits forever for an answer.
+    """
+
+    def __init__(self, timeout=(3.05, 10), retries=3, backoff_factor=0.5, pool_size=10, max_concurrency=10):
+        """
+        Constructor method to initialize the PokeClient object.
+        timeout is the (connect, read) timeout in seconds of every request.
+        Failed requests (429 and 5xx answers or connection errors) are retried up to retries times, waiting backoff_factor * 2^n seconds in between.
+        max_concurrency is the highest number of requests sent at the same time by the whole application, to respect the PokéAPI fair use policy.
+        """
+        self.timeout = timeout
+        retry = Retry(total=retries, backoff_factor=backoff_factor, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset(['GET']), respect_retry_after_header=True, raise_on_status=False)  # Return the last answer instead of raising when the retries run out
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()  # Reuse the TCP and TLS connections between requests
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+
+    def get(self, url, headers=None):
+        """
+        Method to send a GET request.
+        """
+        with self.slots:  # Wait for a free slot if max_concurrency requests are already in flight
+            return self.session.get(url, headers=headers, timeout=self.timeout)
+
+    def close(self):
+        """
+        Method to close the pooled connections.
+        """
+        self.session.close()
@@ -0,0 +1,286 @@
+import json  # Importing the json module for the description of the stored columns
+import os  # Importing the os module for creating and replacing the column files
+import shutil  # Importing the shutil module for deleting the files of older generations
+import numpy as np  # Importing numpy for the memory-mapped columns
+
+STAT_COLUMNS = ['hp', 'attack', 'defense', 'special_attack', 'special_defense', 'speed']
+STRING_TABLES = {'names': 'name', 'images': 'image'}  # String table -> roster column
+STAT_TYPE = np.dtype('<u2')  # Base stats are below 256, an unsigned 16 bit integer leaves room for any future stat
+TOTAL_TYPE = np.dtype('<u4')  # The sum of six stats may not fit in a stat
+OFFSET_TYPE = np.dtype('<u8')
+ORDER_TYPE = np.dtype('<u4')
+MASK_TYPE = np.dtype('<u4')  # One bit per type, the bits are given in the order the types were first seen (see the 'types' of the meta)
+EMPTY = {'generation': 0, 'rows': 0, 'rowid': 0, 'version': None, 'rewrites': None, 'types': [], 'ends': {table: 0 for table in STRING_TABLES}}  # Generation 0 has no files yet
+
+class StatsColumns():
+    """
+    Class representing the columnar copy of the roster stats: one file of fixed-width integers per stat and for the type(s), plus string tables for the names and images.
+    The files are memory-mapped, so opening a store of any size only reads its description.
+    The files of a store are kept in the directory of its generation, and a new generation is started instead of changing rows that were written.
+    Readers use snapshot, a ColumnsSnapshot of the rows described when it was taken, which is replaced (not changed) by every append.
+    """
+
+    def __init__(self, path='pokehub.columns'):
+        """
+        Constructor method to initialize the StatsColumns object.
+        The files are only created by the first write (see reset), the store is empty until then.
+        """
+        self.path = path
+        self.snapshot = None
+        os.makedirs(path, exist_ok=True)
+
+    def directory(self, generation):
+        """
+        Method to get the directory of the files of a generation.
+        """
+        return os.path.join(self.path, str(generation))
+
+    def load_meta(self):
+        """
+        Method to read the description of the store from its file, an empty store if it has none (or was written by older versions).
+        """
+        try:
+            with open(os.path.join(self.path, 'meta.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return dict(EMPTY)
+        return meta if 'ends' in meta else dict(EMPTY)  # Stores written by older versions are rebuilt
+
+    def read_meta(self):
+        """
+        Method to read the description of the store: the number of rows and the roster state they mirror.
+        Returns the snapshot of those rows, a new one if the files were changed (eg. by another process).
+        """
+        meta = self.load_meta()
+        while True:
+            snapshot = self.snapshot
+            if snapshot is not None and meta == snapshot.meta:
+                return snapshot
+            try:
+                snapshot = ColumnsSnapshot(self.path, meta)
+            except FileNotFoundError:
+                latest = self.load_meta()
+                if latest == meta:
+                    raise
+                meta = latest  # A new generation was started (and the old one deleted) while it was mapped, use the new one
+                continue
+            self.snapshot = snapshot  # Swapped at once, readers keep the snapshot they already have
+            return snapshot
+
+    def write_meta(self, meta):
+        """
+        Method to save the description of the store. It is written last, so readers never see rows that are only half written.
+        """
+        with open(os.path.join(self.path, 'meta.json.tmp'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(os.path.join(self.path, 'meta.json.tmp'), os.path.join(self.path, 'meta.json'))
+
+    def reset(self):
+        """
+        Method to start a new, empty generation of the store and delete the files of the older ones.
+        Snapshots already taken have their arrays mapped, so they keep reading the deleted files (on Windows they are deleted by a later reset).
+        Returns the description of the new generation.
+        """
+        generation = self.load_meta()['generation'] + 1
+        directory = self.directory(generation)
+        shutil.rmtree(directory, ignore_errors=True)  # Left by a reset that was interrupted before its meta was written
+        os.makedirs(directory)
+        empty = {column + '.u16': b'' for column in STAT_COLUMNS}
+        empty['total.u32'] = b''
+        empty.update({table + '.bin': b'' for table in STRING_TABLES})
+        empty.update({table + '.idx': np.zeros(1, OFFSET_TYPE).tobytes() for table in STRING_TABLES})  # A string table always starts at offset 0
+        empty['types.u4'] = b''
+        for name, data in empty.items():
+            with open(os.path.join(directory, name), 'wb') as f:
+                f.write(data)
+        meta = dict(EMPTY, generation=generation)
+        self.write_meta(meta)
+        for entry in os.scandir(self.path):
+            if entry.name in (str(generation), 'meta.json'):
+                continue
+            try:
+                if entry.is_dir():
+                    shutil.rmtree(entry.path)
+                else:
+                    os.remove(entry.path)  # Files of older versions, kept in path itself
+            except OSError:
+                pass  # Still mapped on a system that doesn't allow deleting it, the next reset tries again
+        return meta
+
+    def write_at(self, name, size, data):
+        """
+        Method to write data at the given byte of a file, dropping anything left after it by an append that was interrupted.
+        Only bytes past the described rows are dropped, so mapped arrays are never affected.
+        """
+        with open(name, 'r+b') as f:
+            f.seek(size)
+            f.write(data)
+            f.truncate()
+
+    def append(self, rows, meta):
+        """
+        Method to add rows at the end of the store and save the roster state it now mirrors.
+        rows is a list of dictionaries with the name, image, type(s) (eg. "grass, poison") and six stats of a Pokémon, in registration order.
+        Only one writer may append at a time, the roster holds its write lock meanwhile. It only writes the new rows
+        (nothing already stored is read or sorted again), so it takes the same time whatever the size of the store.
+        """
+        base = self.load_meta()  # The rows described by the file, whatever snapshot readers use
+        directory = self.directory(base['generation'])
+        file = lambda name: os.path.join(directory, name)
+        count = base['rows']
+        types = list(base['types'])
+        masks = np.zeros(len(rows), dtype=MASK_TYPE)
+        for i, row in enumerate(rows):
+            for type in (row['type'] or '').split(', '):
+                if type and type not in types:
+                    types.append(type)
+                if type:
+                    masks[i] |= 1 << types.index(type)
+        self.write_at(file('types.u4'), count * MASK_TYPE.itemsize, masks.tobytes())
+        total = np.zeros(len(rows), dtype=TOTAL_TYPE)
+        for column in STAT_COLUMNS:
+            values = np.array([row[column] or 0 for row in rows], dtype=STAT_TYPE)  # A missing stat is stored as 0
+            total += values
+            self.write_at(file(column + '.u16'), count * STAT_TYPE.itemsize, values.tobytes())
+        self.write_at(file('total.u32'), count * TOTAL_TYPE.itemsize, total.tobytes())
+        ends = dict(base['ends'])
+        for table, key in STRING_TABLES.items():
+            encoded = [(row[key] or '').encode('utf-8') + b'\n' for row in rows]  # Every value ends with a newline, a missing one is stored as an empty string
+            offsets = ends[table] + np.cumsum([len(value) for value in encoded], dtype=OFFSET_TYPE)
+            self.write_at(file(table + '.bin'), ends[table], b''.join(encoded))
+            self.write_at(file(table + '.idx'), (count + 1) * OFFSET_TYPE.itemsize, offsets.tobytes())
+            ends[table] = int(offsets[-1]) if len(rows) else ends[table]
+        self.write_meta(dict(meta, generation=base['generation'], rows=count + len(rows), types=types, ends=ends))
+
+class ColumnsSnapshot():
+    """
+    Class representing the rows of a StatsColumns store as they were described by one version of its meta.
+    It never changes: every array is mapped when it is created, and the files are only appended to past its rows or deleted,
+    which leaves the mapped arrays intact. Every array read through it has the same number of rows, whatever is written meanwhile.
+    """
+
+    def __init__(self, path, meta):
+        """
+        Constructor method to initialize the ColumnsSnapshot object, mapping its arrays.
+        Raises FileNotFoundError if the generation of meta was deleted by a newer one.
+        """
+        self.path = path
+        self.meta = meta
+        self.directory = os.path.join(path, str(meta['generation']))
+        rows = meta['rows']
+        self.maps = {}  # File -> mapped array, plus the arrays computed from them
+        for column in STAT_COLUMNS:
+            self.map(column + '.u16', STAT_TYPE, rows)
+        self.map('total.u32', TOTAL_TYPE, rows)
+        self.map('types.u4', MASK_TYPE, rows)
+        for table in STRING_TABLES:
+            self.map(table + '.idx', OFFSET_TYPE, rows + 1)
+            self.map(table + '.bin', np.uint8, meta['ends'][table])
+
+    def file(self, name):
+        """
+        Method to get the path of one of the files of the generation.
+        """
+        return os.path.join(self.directory, name)
+
+    def map(self, name, dtype, rows):
+        """
+        Method to memory-map the first rows of one of the files as a read-only array, keeping it in maps.
+        """
+        if rows == 0 or self.meta['generation'] == 0:
+            mapped = np.zeros(rows, dtype=dtype)  # An empty file can't be mapped, and a string table always starts at offset 0
+        else:
+            mapped = np.memmap(self.file(name), dtype=dtype, mode='r', shape=(rows,))
+        self.maps[name] = mapped
+        return mapped
+
+    def column(self, column):
+        """
+        Method to get one of the stats of every row, in registration order.
+        """
+        return self.maps[column + '.u16']
+
+    def total(self):
+        """
+        Method to get the total stats of every row, in registration order.
+        """
+        return self.maps['total.u32']
+
+    def order(self):
+        """
+        Method to get the row numbers sorted from the highest to the lowest total stats, ties in registration order.
+        It is sorted by the first reader of the snapshot, so writes never have to keep it sorted.
+        """
+        order = self.maps.get('order')
+        if order is None:
+            order = np.argsort(-self.total().astype(np.int64), kind='stable').astype(ORDER_TYPE)
+            self.maps['order'] = order
+        return order
+
+    def offsets(self, table):
+        """
+        Method to get where each value of a string table starts, the last offset is the end of the table.
+        """
+        return self.maps[table + '.idx']
+
+    def strings(self, table):
+        """
+        Method to decode every value of a string table at once, in registration order.
+        """
+        return bytes(self.maps[table + '.bin']).decode('utf-8').split('\n')[:-1]
+
+    def string(self, table, row):
+        """
+        Method to decode a single value of a string table, without reading the others.
+        """
+        offsets = self.offsets(table)
+        return bytes(self.maps[table + '.bin'][offsets[row]:offsets[row + 1] - 1]).decode('utf-8')
+
+    def type_masks(self):
+        """
+        Method to get the type(s) of every row as bit masks, in registration order.
+        """
+        return self.maps['types.u4']
+
+    def type_names(self, mask):
+        """
+        Method to convert a bit mask of types back to the type names.
+        """
+        return [type for bit, type in enumerate(self.meta['types']) if int(mask) >> bit & 1]
+
+    def values(self, key):
+        """
+        Method to get one of the stats, or the total stats if key is 'total', of every row in registration order.
+        """
+        return self.total() if key == 'total' else self.column(key)
+
+    def query(self, key='total', limit=20, types=None, minimums=None, after=None):
+        """
+        Method to select the rows with the highest value of a stat (or the total), without sorting the rows that are not returned.
+        types keeps the rows that have all the given types, minimums maps stats (or 'total') to their lowest allowed value
+        and after is the (value, row) of the last row of the previous page. Ties are returned in registration order.
+        Returns the selected row numbers, best first.
+        """
+        if key != 'total' and key not in STAT_COLUMNS:
+            raise ValueError(f"Unknown stat {key}.")
+        rows = self.meta['rows']
+        values = self.values(key).astype(np.int64)
+        keep = np.ones(rows, dtype=bool)
+        if types:
+            if any(type not in self.meta['types'] for type in types):
+                return np.zeros(0, dtype=np.intp)  # No saved Pokémon has that type
+            bits = sum(1 << self.meta['types'].index(type) for type in set(types))
+            keep &= (self.type_masks() & bits) == bits
+        for column, minimum in (minimums or {}).items():
+            if column != 'total' and column not in STAT_COLUMNS:
+                raise ValueError(f"Unknown stat {column}.")
+            keep &= self.values(column) >= minimum
+        if after is not None:
+            value, row = after
+            keep &= (values < value) | ((values == value) & (np.arange(rows) > row))  # Only the rows after the previous page
+        selected = np.flatnonzero(keep)
+        rank = ((values.max(initial=0) - values[selected]) << 32) | selected  # Smaller is better: highest value first, then registration order
+        if len(selected) > limit:
+            best = np.argpartition(rank, limit - 1)[:limit] if limit > 0 else np.zeros(0, dtype=np.intp)  # Partial selection, the other rows are never sorted
+            selected, rank = selected[best], rank[best]
+        return selected[np.argsort(rank)]
@@ -0,0 +1,137 @@
+import contextlib  # Importing the contextlib module for the timer context manager
+import contextvars  # Importing the contextvars module for knowing which route made a request
+import threading  # Importing the threading module for updating the metrics from several threads
+import time  # Importing the time module for measuring durations
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # Upper bounds in seconds of the histogram buckets
+
+METRICS = {  # Name -> (type, help) of the metrics used by the application
+    'pokehub_http_request_seconds': ('histogram', "Time spent answering a request of the web application, by route."),
+    'pokehub_fetch_seconds': ('histogram', "Time spent getting a PokéAPI resource, by cache result."),
+    'pokehub_cache_requests_total': ('counter', "PokéAPI lookups by cache result (hit, miss, revalidated, shared, stale or offline)."),
+    'pokehub_upstream_requests_total': ('counter', "Requests sent to the PokéAPI, by route of the web application and status."),
+    'pokehub_upstream_bytes_total': ('counter', "Bytes received from the PokéAPI."),
+    'pokehub_storage_seconds': ('histogram', "Time spent reading or writing the roster, by operation."),
+    'pokehub_render_seconds': ('histogram', "Time spent building the plotly figures and rendering the templates, by view and step."),
+    'pokehub_cache_hit_ratio': ('gauge', "Share of the PokéAPI lookups answered from the cache."),
+    'pokehub_cache_entries': ('gauge', "Responses stored in the cache."),
+    'pokehub_cache_bytes': ('gauge', "Bytes of the responses stored in the cache."),
+    'pokehub_refresh_total': ('counter', "Expired responses fetched again in the background, by result (changed, unchanged or failed)."),
+    'pokehub_refresh_queue': ('gauge', "Expired responses waiting to be fetched again in the background."),
+    'pokehub_log_dropped_total': ('counter', "Request log records dropped because the writer fell behind."),
+}
+
+class Metrics():
+    """
+    Class representing a set of counters, gauges and histograms that can be rendered in the Prometheus text format.
+    Every value is identified by its name and labels, eg. metrics.inc('pokehub_upstream_requests_total', route='/add', status=200).
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Constructor method to initialize the Metrics object.
+        """
+        self.buckets = tuple(buckets)
+        self.values = {}  # (name, labels) -> value of the counters and gauges
+        self.histograms = {}  # (name, labels) -> [count of each bucket, sum, count]
+        self.lock = threading.Lock()
+        self.route = contextvars.ContextVar('route', default='')  # Route of the web request being answered, if any
+
+    def key(self, name, labels):
+        """
+        Method to get the key of a value, the labels are sorted so their order doesn't matter.
+        """
+        return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        """
+        Method to increase a counter.
+        """
+        key = self.key(name, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """
+        Method to set the value of a gauge.
+        """
+        with self.lock:
+            self.values[self.key(name, labels)] = value
+
+    def observe(self, name, seconds, **labels):
+        """
+        Method to add a duration to a histogram.
+        """
+        key = self.key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[i] += 1
+                    break  # Buckets are stored per range and added up when rendered
+            histogram[-2] += seconds
+            histogram[-1] += 1
+
+    @contextlib.contextmanager
+    def timer(self, name, **labels):
+        """
+        Method to add the duration of a with block to a histogram, eg. with metrics.timer('pokehub_storage_seconds', operation='register'): ...
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def get(self, name, **labels):
+        """
+        Method to get the value of a counter or gauge (0 if it was never set).
+        """
+        return self.values.get(self.key(name, labels), 0)
+
+    def total(self, name):
+        """
+        Method to get the sum of a counter over all its labels.
+        """
+        with self.lock:
+            return sum(value for (metric, _), value in self.values.items() if metric == name)
+
+    def format_labels(self, labels, extra=()):
+        """
+        Method to format labels as {name="value",...}.
+        """
+        labels = list(labels) + list(extra)
+        if not labels:
+            return ''
+        escaped = [(label, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for label, value in labels]
+        return '{' + ','.join(f'{label}="{value}"' for label, value in escaped) + '}'
+
+    def render(self):
+        """
+        Method to get every metric in the Prometheus text exposition format.
+        """
+        with self.lock:
+            values = dict(self.values)
+            histograms = {key: list(histogram) for key, histogram in self.histograms.items()}
+        names = sorted({name for name, _ in values} | {name for name, _ in histograms})
+        lines = []
+        for name in names:
+            kind, description = METRICS.get(name, ('untyped', name))
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (metric, labels), value in sorted(values.items()):
+                if metric == name:
+                    lines.append(f"{name}{self.format_labels(labels)} {value}")
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets, histogram):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{self.format_labels(labels, [('le', str(bound))])} {cumulative}")
+                lines.append(f"{name}_bucket{self.format_labels(labels, [('le', '+Inf')])} {histogram[-1]}")
+                lines.append(f"{name}_sum{self.format_labels(labels)} {histogram[-2]}")
+                lines.append(f"{name}_count{self.format_labels(labels)} {histogram[-1]}")
+        return '\n'.join(lines) + '\n'
@@ -1,52 +1,251 @@
 import requests  # Importing the requests library for making HTTP requests
-import pandas as pd  # Importing the pandas library for data manipulation and analysis
-import datetime  # Importing the datetime module for working with dates and times
-import plotly.graph_objects as go  # Importing the graph_objects module from the plotly library for creating interactive visualizations
+import numpy as np  # Importing numpy for reading the columns of the stats
+import time  # Importing the time module for measuring the latency of the requests
+import os  # Importing the os module for replacing files
+import csv  # Importing the csv module for the types data
+import threading  # Importing the threading module for running the warmup in the background
+import contextvars  # Importing the contextvars module for passing the context of the caller to the worker threads
+from urllib.parse import urlsplit  # Importing urlsplit for finding the resource of a URL
+from concurrent.futures import ThreadPoolExecutor  # Importing ThreadPoolExecutor for sending requests in parallel
+from cache import ResponseCache  # Importing the on-disk cache of API responses
+from client import PokeClient  # Importing the pooled HTTP client
+from requestlog import JsonLinesLog  # Importing the request log
+from metrics import Metrics  # Importing the counters and timings of the application
+from singleflight import SingleFlight  # Importing the coalescing of concurrent requests
+from refresher import Refresher  # Importing the background refresh of the expired responses
+from records import PokemonRecord, is_pokemon_url, compact_body  # Importing the compact records of the Pokémon details
+from snapshot import PokedexPack  # Importing the local data pack of the offline mode
+from typechart import TypeChart  # Importing the type effectiveness matrix
+from team import TeamAnalysis, MAX_TEAM_SIZE  # Importing the team matchup analysis
+from storage import RosterStore, POKEMON_COLUMNS, STATS_COLUMNS  # Importing the storage of the roster
 
 class PokemonGo():
     """
     Class representing the PokemonGo application.
     """
 
-    def __init__(self):
+    def __init__(self, url='https://pokeapi.co/api/v2/', cache=None, storage=None, client=None, pack=None, log=None, metrics=None, flights=None, refresh=False, max_workers=8):
         """
         Constructor method to initialize the PokemonGo object.
+        A different base URL (eg. a local stub server), HTTP client and response cache can be given, by default responses are cached in http_cache.sqlite.
+        With a data pack (see snapshot) the application works offline, answering every request from the pack.
+        storage is where the roster is saved, by default pokehub.db (the CSV files of older versions are imported into it).
+        log receives a record of every request, by default written as JSON lines to log.jsonl (MemoryLog keeps them in memory instead).
+        metrics collects the timings of the requests and of the roster (see Metrics), they are shown by the /metrics page of the web application.
+        flights coalesces concurrent requests for the same URL (see SingleFlight), by default also between the processes sharing the response cache.
+        With refresh=True expired responses of the cache are answered at once and fetched again in the background (see Refresher),
+        so only the first lookup of a resource waits for the API. It can also be a Refresher with other settings.
+        max_workers limits the number of requests sent at the same time when fetching in parallel.
+        """
+        self.url = url  # Base URL for the Pokemon API
+        self.client = client if client is not None else PokeClient()  # Pooled HTTP client shared by every request
+        self.cache = cache if cache is not None else ResponseCache()  # Cache of the API responses
+        self.pack = pack  # Local copy of the whole Pokédex for the offline mode
+        self.log = log if log is not None else JsonLinesLog()  # Request log, written by a background thread
+        self.metrics = metrics if metrics is not None else Metrics()  # Counters and timings of the application
+        self.flights = flights if flights is not None else SingleFlight(self.cache.path + '.lock')  # Workers sharing the cache file also share its lock
+        self.storage = storage if storage is not None else RosterStore(migrate=True)  # Storage of the registered Pokémon, the pokemons.csv and pokemons_stats.csv files of older versions are imported into it
+        self.chart = None  # Type effectiveness chart, loaded on first use
+        self.chart_lock = threading.Lock()
+        self.species = None  # Name -> type(s) of every Pokémon of the Pokédex, loaded on first use
+        self.records = {}  # Name -> PokemonRecord of every Pokémon looked up so far, the whole Pokédex takes a few hundred KB
+        self.max_workers = max_workers
+        if refresh is True:
+            refresh = Refresher(self)
+        self.refresher = refresh if refresh and pack is None else None  # Nothing expires in offline mode
+
+    def log_requests(self, response, cache='miss', latency=None):
+        """
+        Method to log a request made by the application, without waiting for the log to be written.
+        cache tells where the answer came from: 'hit', 'miss' (the API), 'revalidated' (the API confirmed the cached copy), 'shared' (the request of a concurrent lookup), 'stale' (an expired cached copy, refreshed in the background) or 'offline' (the data pack).
+        """
+        self.log.log(url=response.url, status=response.status_code, cache=cache,
+                     latency_ms=round(latency * 1000, 2) if latency is not None else None, bytes=len(response.content))
+        self.metrics.inc('pokehub_cache_requests_total', result=cache)
+        if latency is not None:
+            self.metrics.observe('pokehub_fetch_seconds', latency, cache=cache)
+        if cache in ('miss', 'revalidated'):  # The request reached the API
+            self.metrics.inc('pokehub_upstream_requests_total', route=self.metrics.route.get() or 'none', status=response.status_code)
+            self.metrics.inc('pokehub_upstream_bytes_total', len(response.content))
+
+    def map_concurrently(self, function, items):
+        """
+        Method to call a function on every item concurrently (at most max_workers at a time), returning the results in order.
+        The calls see the context of the caller, eg. the route of the web request used by the metrics.
+        """
+        context = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(lambda item: context.copy().run(function, item), items))
+
+    def fetch(self, url):
+        """
+        Method to send a GET request to the API, answering it from the response cache when possible.
+        In offline mode every request is answered from the data pack.
+        """
+        start = time.perf_counter()
+        if self.pack is not None:
+            response = self.pack.response(url, self.url)  # Local disk only, the network is never used
+            self.log_requests(response, 'offline', time.perf_counter() - start)
+            return response
+        response, entry = self.cache.get(url, stale=self.refresher is not None)  # Look the URL up in the cache
+        if response is not None:
+            if entry is not None:  # The cached copy expired, answer it anyway and fetch it again in the background
+                self.refresher.schedule(url)
+                self.log_requests(response, 'stale', time.perf_counter() - start)
+                return response
+            self.log_requests(response, 'hit', time.perf_counter() - start)
+            return response  # The cached copy is still fresh, no request is needed
+        response, shared = self.flights.do(url, lambda: self.fetch_upstream(url, entry, start))  # Concurrent lookups of the same URL share one request
+        if shared:
+            self.log_requests(response, 'shared', time.perf_counter() - start)
+        return response
+
+    def fetch_upstream(self, url, entry, start, send=None):
+        """
+        Method to get a resource missing from the response cache (or stale) from the API, a single caller at a time per URL.
+        entry is the stale cached copy, if any. When other processes share the cache, they take turns per URL,
+        so a process that waited finds the response stored by the other one instead of sending the same request.
+        send(url, headers=...) sends the request, by default with the PokeClient (AsyncPokemonGo sends it with aiohttp).
+        """
+        send = send if send is not None else self.client.get
+        with self.flights.process_lock(url) as locked:
+            if locked:
+                response, entry = self.cache.get(url)  # Another process may have stored it while this one waited
+                if response is not None:
+                    self.log_requests(response, 'hit', time.perf_counter() - start)
+                    return response
+            response = send(url, headers=self.cache.conditional_headers(entry))  # Send the request, asking only for changes if a stale copy exists
+            if response.status_code == 304 and entry is not None:
+                self.log_requests(response, 'revalidated', time.perf_counter() - start)
+                return self.cache.revalidate(url, entry, response)  # The stale copy is still valid
+            self.log_requests(response, 'miss', time.perf_counter() - start)  # Log the request
+            self.compact(url, response)
+            self.cache.store(url, response)  # Save the response for future requests
+            return response
+
+    def refresh(self, url):
+        """
+        Method to fetch again an expired response of the cache, called by the Refresher in the background.
+        Returns True if it changed, False if the API confirmed it (or another process refreshed it first) and None if the API failed.
+        """
+        start = time.perf_counter()
+        response, entry = self.cache.get(url)
+        if response is not None:
+            return False  # Already refreshed
+        response, _ = self.flights.do(url, lambda: self.fetch_upstream(url, entry, start))  # Shares the request with a lookup of the same URL
+        if response.status_code != 200:
+            return None  # The expired copy is kept
+        changed = entry is None or response.content != entry['body']
+        if changed:
+            self.forget(url)
+        return changed
+
+    def forget(self, url):
+        """
+        Method to drop what was derived from a response that changed: the record of a Pokémon, or the type chart and Pokédex species.
+        """
+        path = urlsplit(url).path.rstrip('/').split('/')
+        if is_pokemon_url(url):
+            record = self.records.pop(path[-1], None)
+            if record is not None:
+                self.records.pop(record.name, None)
+                self.records.pop(str(record.id), None)
+        elif 'type' in path:
+            self.species = None
+            with self.chart_lock:
+                self.fetch_and_save_types_data()  # Rewrite types.csv from the cache, it was only created once before
+                self.chart = None  # Loaded again by its next use
+
+    def invalidate(self):
         """
-        self.url = 'https://pokeapi.co/api/v2/'  # Base URL for the Pokemon API
+        Method to mark every cached response as expired, they are answered until they are fetched again (in the background with a Refresher).
+        Returns the number of responses.
+        """
+        invalidated = self.cache.invalidate()
+        self.records.clear()  # The next lookups go through the cache, which schedules their refresh
+        if self.refresher is not None and invalidated:
+            self.refresher.sweep()
+        return invalidated
 
-    def log_requests(self, response):
+    def compact(self, url, response):
         """
-        Method to log the HTTP requests made by the application.
+        Method to shrink the details of a Pokémon to the fields the application uses before they are cached (see PokemonRecord).
+        The full answer (moves, games, every sprite...) is often 100 times bigger and is never kept.
         """
-        with open('log.txt', 'a') as f:  # Open the log.txt file in append mode
-            f.write(f"{datetime.datetime.now()} - {response.url} - {response.status_code}\n")  # Write the request details to the log file
+        if response.status_code == 200 and is_pokemon_url(url):
+            response._content = compact_body(response.content)
+        return response
+
+    def fetch_json(self, url):
+        """
+        Method to fetch a resource given by its URL (eg. the details of a type), returning its JSON data or None.
+        """
+        response = self.fetch(url)  # Send a GET request to fetch the resource, the client retries it if it fails
+        if response.status_code == 200:
+            return response.json()  # Convert the response to JSON format and return it
+        return None
 
     def fetch_and_save_types_data(self):
         """
         Method to fetch and save the Pokemon type data from the API.
+        The details of the types are fetched concurrently, at most max_workers at a time.
         """
         try:
-            response = requests.get(self.url + 'type')  # Send a GET request to the API to fetch the type data
-            self.log_requests(response)  # Log the request
+            response = self.fetch(self.url + 'type')  # Send a GET request to the API to fetch the type data
 
             if response.status_code == 200:  # If the request is successful
                 data = response.json()  # Convert the response to JSON format
-                types = []
-                for type in data['results']:
-                    type_url = type['url']
-                    type_response = requests.get(type_url)  # Send a GET request to fetch the details of a specific type
-                    self.log_requests(type_response)  # Log the request
-                    type_data = type_response.json()  # Convert the response to JSON format
-
-                    weaknesses = [d['name'] for d in type_data['damage_relations']['double_damage_from']]  # Extract the weakness types
-                    resistances = [r['name'] for r in type_data['damage_relations']['half_damage_from']]  # Extract the resistance types
-                    advantages = [v['name'] for v in type_data['damage_relations']['double_damage_to']]  # Extract the advantage types
-
-                    if type['name'] not in ["unknown", "shadow"]:
-                        types.append({'Type': type['name'], 'Weaknesses': weaknesses, 'Resistances': resistances, 'Advantages': advantages})  # Append the type data to the list
-
-                df = pd.DataFrame(types)  # Create a DataFrame from the type data
-                df.to_csv('types.csv', index=False)  # Save the DataFrame to a CSV file
+                results = [type for type in data['results'] if type['name'] not in ["unknown", "shadow"]]
+                details = self.map_concurrently(lambda type: self.fetch_json(type['url']), results)  # Fetch the details of every type at the same time
+                self.save_types_data(results, details)
+        except requests.exceptions.RequestException as e:
+            print(f"There was a problem obtaining the data: {e}")
+            return None
+
+    def save_types_data(self, results, details):
+        """
+        Method to save the weaknesses, resistances, immunities and advantages of every type to types.csv.
+        results are the types listed by the API and details the fetched details of each of them.
+        """
+        types = []
+        for type, type_data in zip(results, details):
+            if type_data is None:
+                print(f"There was a problem obtaining the data of the type {type['name']}.")
+                return None  # Don't save an incomplete type chart
+
+            weaknesses = [d['name'] for d in type_data['damage_relations']['double_damage_from']]  # Extract the weakness types
+            resistances = [r['name'] for r in type_data['damage_relations']['half_damage_from']]  # Extract the resistance types
+            immunities = [i['name'] for i in type_data['damage_relations']['no_damage_from']]  # Extract the immunity types
+            advantages = [v['name'] for v in type_data['damage_relations']['double_damage_to']]  # Extract the advantage types
+
+            types.append({'Type': type['name'], 'Weaknesses': weaknesses, 'Resistances': resistances, 'Immunities': immunities, 'Advantages': advantages})  # Append the type data to the list
+
+        with open('types.csv.tmp', 'w', newline='', encoding='utf-8') as f:  # Save the type data to a temporary CSV file
+            writer = csv.DictWriter(f, fieldnames=['Type', 'Weaknesses', 'Resistances', 'Immunities', 'Advantages'])
+            writer.writeheader()
+            writer.writerows(types)  # The lists are written as their Python representation
+        os.replace('types.csv.tmp', 'types.csv')  # Replace the CSV file at once so it is never read half written
+
+    def snapshot(self, path='pokedex.pack'):
+        """
+        Method to mirror every Pokémon and type of the API into a local data pack for the offline mode.
+        Returns the number of Pokémon in the pack.
+        """
+        try:
+            response = self.fetch(self.url + 'pokemon?limit=100000')  # Send a GET request to list every Pokémon
+            type_response = self.fetch(self.url + 'type')  # Send a GET request to list every type
+            if response.status_code != 200 or type_response.status_code != 200:
+                print("There was a problem obtaining the list of Pokémon and types.")
+                return None
+            results = response.json()['results']
+            type_index = type_response.json()
+            pokemons = self.map_concurrently(lambda pokemon: self.fetch_json(pokemon['url']), results)  # Fetch the details of every Pokémon at the same time
+            types = self.map_concurrently(lambda type: self.fetch_json(type['url']), type_index['results'])  # Fetch the details of every type at the same time
+            missing = [result['name'] for result, pokemon in zip(results, pokemons) if pokemon is None]
+            if missing:
+                print(f"There was a problem obtaining the data of {len(missing)} Pokémon: {', '.join(missing[:10])}")
+            PokedexPack.build(path, type_index, [type for type in types if type], [pokemon for pokemon in pokemons if pokemon])
+            return len(pokemons) - len(missing)
         except requests.exceptions.RequestException as e:
             print(f"There was a problem obtaining the data: {e}")
             return None
@@ -56,224 +255,478 @@ class PokemonGo():
         Method to create the types data if it doesn't already exist.
         """
         try:
-            pd.read_csv('types.csv')  # Try to read the types data from the CSV file
+            with open('types.csv', newline='', encoding='utf-8') as f:
+                columns = next(csv.reader(f), [])  # Only the header is needed
+            if 'Immunities' not in columns:
+                self.fetch_and_save_types_data()  # Files created by older versions lack the immunities, fetch them again
         except FileNotFoundError:
             self.fetch_and_save_types_data()  # Fetch and save the types data if the file doesn't exist
 
-    def get_pokemon(self, pokemon):
+    def warmup(self, background=False):
+        """
+        Method to create and load the types data, and fetch the images missing from the roster, before the first request needs them.
+        With background=True it runs in a separate thread and returns the thread immediately.
+        """
+        if background:
+            thread = threading.Thread(target=self.warmup, daemon=True)
+            thread.start()
+            return thread
+        self.type_chart()
+        self.backfill_images()
+        if self.refresher is not None:
+            self.refresher.start()  # Look for the responses that expired while the application was stopped
+
+    def get_record(self, pokemon):
+        """
+        Method to get the types, stats and image of a specific Pokémon as a PokemonRecord (None if it was not found).
+        Records are kept in memory, so each Pokémon is parsed only once.
+        """
+        return self.lookup_record(pokemon)[0]
+
+    def lookup_record(self, pokemon):
         """
-        Method to get the details of a specific Pokémon from the API.
+        Method to get the record of a specific Pokémon together with the reason it could not be obtained.
+        Returns a tuple (record, error): error is None when the API answered (the record is None if the Pokémon doesn't exist)
+        and a message when the API could not be reached or failed, so that is not mistaken for a Pokémon that doesn't exist.
         """
+        record = self.records.get(pokemon)
+        if record is not None:
+            return record, None
         try:
             url = self.url + 'pokemon/' + pokemon
-            response = requests.get(url)  # Send a GET request to fetch the details of the Pokémon
-            self.log_requests(response)  # Log the request
-
-            if response.status_code == 200:  # If the request is successful
-                return response.json()  # Convert the response to JSON format and return it
-            else:
-                return None
+            response = self.fetch(url)  # Send a GET request to fetch the details of the Pokémon
         except requests.exceptions.RequestException as e:
             print(f"There was a problem obtaining the data: {e}")
-            return None
+            return None, f"the PokéAPI could not be reached ({type(e).__name__})"
+        return self.parse_record(pokemon, response)
+
+    def parse_record(self, pokemon, response):
+        """
+        Method to get the record of a specific Pokémon from the answer of the API, keeping it in memory.
+        Returns a tuple (record, error) like lookup_record.
+        """
+        if response.status_code == 404:  # The Pokémon doesn't exist
+            return None, None
+        if response.status_code != 200:
+            return None, f"the PokéAPI answered {response.status_code}"
+        record = PokemonRecord.from_json(response.content)  # Only the record is kept, not the parsed answer
+        if record is None:
+            return None, "the answer of the PokéAPI could not be read"
+        self.records[pokemon] = record
+        return record, None
+
+    def get_pokemon(self, pokemon):
+        """
+        Method to get the details of a specific Pokémon from the API, with only the fields the application uses (see PokemonRecord.to_data).
+        """
+        record = self.get_record(pokemon)
+        return record.to_data() if record is not None else None
 
     def get_pokemon_image(self, pokemon):
         """
         Method to get the image of a specific Pokémon.
         """
-        try:
-            data = self.get_pokemon(pokemon)  # Get the Pokémon data
-            try:
-                image = data['sprites']['front_default'] if data else None  # Extract the image URL from the data if it exists, otherwise return None
-                return image
-            except KeyError:
-                return None
-        except TypeError:
-            return None
+        record = self.get_record(pokemon)  # Get the Pokémon data
+        return record.image if record is not None else None
+
+    def get_pokemon_images(self, names):
+        """
+        Method to get the images of several Pokémon, fetching them concurrently.
+        Returns a dictionary with the image URL of each Pokémon.
+        """
+        images = self.map_concurrently(self.get_pokemon_image, names)  # Fetch the images at most max_workers at a time
+        return dict(zip(names, images))
+
+    def backfill_images(self):
+        """
+        Method to fetch and save the image URL of the Pokémon stats that were saved without one.
+        Returns True if any image was added.
+        """
+        names = self.storage.names_without_image()
+        if not names:
+            return False
+        images = self.get_pokemon_images(names)  # Fetch only the missing images, all at once
+        with self.metrics.timer('pokehub_storage_seconds', operation='set_images'):
+            self.storage.set_images(images)  # Save them so they are never fetched again
+        return True
 
     def get_pokemon_type(self, pokemon):
         """
         Method to get the type(s) of a specific Pokémon.
         """
-        try:
-            data = self.get_pokemon(pokemon)  # Get the Pokémon data
-            try:
-                types = [type_info['type']['name'] for type_info in data['types']] if data else None  # Extract the type(s) from the data if it exists, otherwise return None
-                return types
-            except KeyError:
-                return None
-        except TypeError:
-            return None
-        
-    def get_pokemon_data(self, pokemon):
+        record = self.get_record(pokemon)  # Get the Pokémon data
+        return record.types if record is not None else None
+
+    def type_chart(self):
         """
-        Method to get the data of a specific Pokémon from the CSV file.
+        Method to get the type effectiveness chart, loading it from the types data only once.
         """
-        try:
+        with self.chart_lock:  # Requests arriving during the warmup wait for it instead of fetching the types again
+            if self.chart is None:
+                self.createtypesdata()  # Create the types data if it doesn't exist
+                try:
+                    self.chart = TypeChart.from_csv('types.csv')  # Load the damage multiplier matrix
+                except FileNotFoundError:
+                    print("The file 'types.csv' was not found.")
+        return self.chart
+
+    def get_matchup(self, pokemon, types=None):
+        """
+        Method to get the weaknesses, resistances, immunities and advantages of a specific Pokémon from the type chart.
+        If the type(s) of the Pokémon are already known they can be passed in to avoid fetching them again.
+        """
+        if types is None:
             types = self.get_pokemon_type(pokemon)  # Get the type(s) of the Pokémon
-            df = pd.read_csv('types.csv')  # Read the types data from the CSV file
-
-            if len(types)==1:  # If the Pokémon has only one type
-                df = df[df['Type'] == types[0]]  # Filter the DataFrame to include only the rows with the matching type
-            else:  # If the Pokémon has two types
-                df1 = df[df['Type'] == types[0]]  # Filter the DataFrame to include only the rows with the first type
-                df2 = df[df['Type'] == types[1]]  # Filter the DataFrame to include only the rows with the second type
-                df = pd.concat([df1, df2])  # Concatenate the two DataFrames
-            return df  # Return the filtered DataFrame
-        except FileNotFoundError:
-            print("The file 'types.csv' was not found.")
-            return pd.DataFrame()  # Return an empty DataFrame if the file doesn't exist
+        chart = self.type_chart()
+        if not types or chart is None:
+            return None
+        return chart.matchup(types)
 
-    def get_weakness_and_resistance(self, pokemon):
+    def get_weakness_and_resistance(self, pokemon, types=None):
         """
         Method to get the weakness and resistance types of a specific Pokémon.
         """
-        df = self.get_pokemon_data(pokemon)  # Get the Pokémon data
-        if not df.empty:  # If the DataFrame is not empty
-            # Concatenate and deduplicate weakness and resistance lists
-            weakness = set()
-            resistance = set()
-            for w, r in zip(df['Weaknesses'].values, df['Resistances'].values):
-                # convert string representation of list to actual list
-                w = w.strip("[]").replace("'", "").split(", ")
-                r = r.strip("[]").replace("'", "").split(", ")
-                weakness.update(w)
-                resistance.update(r)
-            # Remove any weaknesses that are also resistances
-            neutral_weakness = weakness.intersection(resistance)
-            weakness = weakness.difference(neutral_weakness)
-            resistance = resistance.difference(neutral_weakness)
-            return sorted(list(weakness)), sorted(list(resistance))  # Return sorted weakness and resistance lists
+        matchup = self.get_matchup(pokemon, types)  # Get the matchup of the Pokémon's type(s)
+        if matchup:
+            return matchup["weaknesses"], matchup["resistances"]  # Return sorted weakness and resistance lists
         else:
             return None, None
 
-    def get_weakness(self, pokemon):
+    def get_weakness(self, pokemon, types=None):
         """
         Method to get the weakness types of a specific Pokémon.
         """
-        weakness, _ = self.get_weakness_and_resistance(pokemon)  # Get the weakness and resistance types
+        weakness, _ = self.get_weakness_and_resistance(pokemon, types)  # Get the weakness and resistance types
         return weakness
 
-    def get_resistance(self, pokemon):
+    def get_resistance(self, pokemon, types=None):
         """
         Method to get the resistance types of a specific Pokémon.
         """
-        _, resistance = self.get_weakness_and_resistance(pokemon)  # Get the weakness and resistance types
+        _, resistance = self.get_weakness_and_resistance(pokemon, types)  # Get the weakness and resistance types
         return resistance
 
-    def get_advantage(self, pokemon):
+    def get_advantage(self, pokemon, types=None):
         """
         Method to get the advantage types of a specific Pokémon.
         """
-        df = self.get_pokemon_data(pokemon)  # Get the Pokémon data
-        if not df.empty:  # If the DataFrame is not empty
-            # Concatenate and deduplicate advantage lists
-            advantage = set()
-            for a in df['Advantages'].values:
-                # convert string representation of list to actual list
-                a = a.strip("[]").replace("'", "").split(", ")
-                advantage.update(a)
-            return sorted(list(advantage))  # Return sorted advantage list
+        matchup = self.get_matchup(pokemon, types)  # Get the matchup of the Pokémon's type(s)
+        if matchup:
+            return matchup["advantages"]  # Return sorted advantage list
         else:
             return None
 
-    def basic_info(self, pokemon):
+    def pokedex_species(self):
         """
-        Method to display basic information about a specific Pokémon.
+        Method to get the type(s) of every Pokémon of the Pokédex as a dictionary name -> types, in Pokédex order.
+        Online they are read from the details of each type (which list the Pokémon of that type), so only one request per type is needed.
+        """
+        if self.species is None:
+            if self.pack is not None:
+                self.species = dict(self.pack.species())
+            else:
+                response = self.fetch(self.url + 'type')  # Send a GET request to list every type
+                if response.status_code != 200:
+                    return {}
+                results = [type for type in response.json()['results'] if type['name'] not in ["unknown", "shadow"]]
+                details = self.map_concurrently(lambda type: self.fetch_json(type['url']), results)  # The same cached responses as the types data
+                slots = {}  # Pokémon name -> (Pokédex number, {slot: type})
+                for detail in details:
+                    for entry in (detail or {}).get('pokemon', []):
+                        number = int(entry['pokemon']['url'].rstrip('/').split('/')[-1])
+                        slots.setdefault(entry['pokemon']['name'], (number, {}))[1][entry['slot']] = detail['name']
+                self.species = {name: [types[slot] for slot in sorted(types)]
+                                for name, (_, types) in sorted(slots.items(), key=lambda item: item[1][0])}
+        return self.species
+
+    def types_of(self, names):
+        """
+        Method to get the type(s) of several Pokémon as a list of (name, types) tuples, skipping the ones that were not found.
+        Pokémon that are not in the type details (eg. some forms) are fetched concurrently.
         """
-        types = self.get_pokemon_type(pokemon)  # Get the type(s) of the Pokémon
-        if types:
+        species = self.pokedex_species()
+        missing = [name for name in names if name not in species]
+        fetched = dict(zip(missing, self.map_concurrently(self.get_pokemon_type, missing)))
+        types = [(name, species.get(name) or fetched.get(name)) for name in names]
+        return [(name, pokemon_types) for name, pokemon_types in types if pokemon_types]
+
+    def analyze_team(self, team, opponents=None, limit=10):
+        """
+        Method to analyze the type matchups of a team of up to 6 Pokémon against a list of opponents, by default the whole Pokédex.
+        Returns the analysis as a dictionary (see TeamAnalysis.to_dict) with the names that were not found, or None if the types data is not available.
+        Raises ValueError if the team is too big or none of its Pokémon were found.
+        """
+        chart = self.type_chart()
+        if chart is None:
+            return None
+        team = [self.clean_name(name) for name in team]
+        if len(team) > MAX_TEAM_SIZE:
+            raise ValueError(f"A team can have up to {MAX_TEAM_SIZE} Pokémon.")
+        members = self.types_of(team)
+        if not members:
+            raise ValueError("None of the Pokémon of the team were found.")
+        if opponents is None:
+            rivals = list(self.pokedex_species().items())
+        else:
+            opponents = [self.clean_name(name) for name in opponents]
+            rivals = self.types_of(opponents)
+        found = {name for name, _ in members + rivals}
+        analysis = TeamAnalysis(chart, members, rivals).to_dict(limit)
+        analysis["not_found"] = [name for name in team + (opponents or []) if name not in found]
+        return analysis
+
+    def resolve(self, pokemon):
+        """
+        Method to fetch a specific Pokémon once and derive all of its details from that single response.
+        """
+        record, error = self.lookup_record(pokemon)  # Get the Pokémon data, this is the only request made for the Pokémon
+        return self.resolve_record(pokemon, record, error)
+
+    def resolve_data(self, pokemon, data):
+        """
+        Method to derive the details of a specific Pokémon from its API data (None if it was not found).
+        """
+        return self.resolve_record(pokemon, PokemonRecord.from_data(data) if data else None)
+
+    def resolve_record(self, pokemon, record, error=None):
+        """
+        Method to derive the details of a specific Pokémon from its record (None if it was not found).
+        error is the reason the record could not be obtained, None if the Pokémon doesn't exist.
+        Without the type chart the matchups can't be derived, which is reported as an error too, so the Pokémon isn't saved without them.
+        """
+        if record is None:
             return {
-                "notFound": False,
-                "type": types,
-                "resistant": self.get_resistance(pokemon),
-                "weaknesses": self.get_weakness(pokemon),
-                "advantages": self.get_advantage(pokemon)
+                "notFound": True,
+                "error": error  # Only set when the lookup failed, eg. the PokéAPI was down
             }
-        else:
+        chart = self.type_chart()
+        if chart is None:
             return {
-                "notFound": True
+                "notFound": True,
+                "error": "the type data is not available"  # The type chart is loaded again by the next lookup
             }
+        types = record.types
+        matchup = chart.matchup(types) if types else None  # Derive the weaknesses, resistances and advantages from the known types
+        if matchup is None:
+            matchup = {"weaknesses": [], "resistances": [], "immunities": [], "advantages": []}  # A Pokémon without types has no matchups
+        return {
+            "notFound": False,
+            "name": pokemon,
+            "type": types,
+            "resistant": matchup["resistances"],
+            "weaknesses": matchup["weaknesses"],
+            "immune": matchup["immunities"],
+            "advantages": matchup["advantages"],
+            "stats": record.stats_dict(),  # The stats come from the same response
+            "image": record.image  # The image URL comes from the same response
+        }
+
+    def basic_info(self, pokemon):
+        """
+        Method to display basic information about a specific Pokémon.
+        """
+        return self.resolve(pokemon)  # The resolved details already include the basic information
 
     def pokemon_already_saved(self, pokemon):
         """
-        Method to check if a Pokémon's details are already saved in the CSV file.
+        Method to check if a Pokémon's details are already saved in the roster.
         """
-        df = pd.DataFrame(columns=['name', 'type', 'weakness', 'resistance', 'advantage'])
-        try:
-            df = pd.read_csv('pokemons.csv')  # Try to read the Pokémon data from the CSV file
-        except FileNotFoundError:
-            pass
-        return pokemon in df['name'].values  # Return True if the Pokémon is already saved, otherwise return False
+        return self.storage.has_pokemon(pokemon)  # Return True if the Pokémon is already saved, otherwise return False
 
-    def save_pokemon(self, pokemon):
+    def pokemon_row(self, pokemon, info):
         """
-        Method to save a Pokémon's details to a CSV file.
+        Method to create the roster row with the details of a resolved Pokémon.
         """
-        df = pd.DataFrame(columns=['name', 'type', 'weakness', 'resistance', 'advantage'])  # Create an empty DataFrame with the specified columns
-        try:
-            df = pd.read_csv('pokemons.csv')  # Try to read the Pokémon data from the CSV file
-        except FileNotFoundError:
-            df.to_csv('pokemons.csv', index=False)  # If the file doesn't exist, create a new CSV file with the DataFrame structure
-        try:
-            data = [{'name': pokemon, 'type': ', '.join(self.get_pokemon_type(pokemon)), 'weakness': ', '.join(self.get_weakness(pokemon)), 'resistance': ', '.join(self.get_resistance(pokemon)), 'advantage': ', '.join(self.get_advantage(pokemon))}]  # Create a dictionary with the Pokémon details
-            df = df.append(data, ignore_index=True)  # Append the dictionary to the DataFrame
-            df.to_csv('pokemons.csv', index=False)  # Save the DataFrame to the CSV file
-        except:
-            print("The Pokémon was not found.")
+        return {'name': pokemon, 'type': ', '.join(info['type']), 'weakness': ', '.join(info['weaknesses']), 'resistance': ', '.join(info['resistant']), 'advantage': ', '.join(info['advantages'])}
 
-    def get_pokemon_stats(self, name):
+    def stats_row(self, pokemon, info):
         """
-        Method to create a csv file with the pokemon stats.
+        Method to create the roster row with the stats and image URL of a resolved Pokémon.
         """
-        try:
-            url = f"{self.url}pokemon/{name.lower()}"
-            response = requests.get(url)  # Send a GET request to fetch the detailed information of the Pokémon
-            self.log_requests(response)  # Log the request
-            if response.status_code == 200:  # If the request is successful 
-                df = pd.DataFrame(columns=['name', 'hp', 'attack', 'defense', 'special_attack', 'special_defense', 'speed'])  # Create an empty DataFrame with the specified columns
-                try:
-                    df = pd.read_csv('pokemons_stats.csv')  # Try to read the Pokémon data from the CSV file
-                except FileNotFoundError:
-                    df.to_csv('pokemons_stats.csv', index=False)
-                data = [{'name': name, 'hp': response.json()['stats'][0]['base_stat'], 'attack': response.json()['stats'][1]['base_stat'], 'defense': response.json()['stats'][2]['base_stat'], 'special_attack': response.json()['stats'][3]['base_stat'], 'special_defense': response.json()['stats'][4]['base_stat'], 'speed': response.json()['stats'][5]['base_stat']}]  # Create a dictionary with the Pokémon details
-                df = df.append(data, ignore_index=True)  # Append the dictionary to the DataFrame
-                df.to_csv('pokemons_stats.csv', index=False)  # Save the DataFrame to the CSV file
+        stats = info["stats"]  # Get the stats of the Pokémon
+        return {'name': pokemon, 'hp': stats['hp'], 'attack': stats['attack'], 'defense': stats['defense'], 'special_attack': stats['special-attack'], 'special_defense': stats['special-defense'], 'speed': stats['speed'], 'image': info["image"]}
 
-            else:
-                print(f"No information was found for the Pokémon {name.capitalize()}.")
-                return None
-        except requests.exceptions.RequestException as e:
-            print(f"There was a problem obtaining the data: {e}")
+    def register(self, pokemon, info=None):
+        """
+        Method to save a Pokémon's details and stats to the roster if it isn't already saved.
+        Both are saved in a single transaction, so concurrent requests (even from other processes) never duplicate or lose a Pokémon.
+        Returns True if the Pokémon was saved by this call.
+        """
+        if info is None:
+            info = self.resolve(pokemon)  # Resolve the Pokémon details if they were not given
+        if info["notFound"]:
+            return False
+        with self.metrics.timer('pokehub_storage_seconds', operation='register'):
+            return self.storage.register(self.pokemon_row(pokemon, info), self.stats_row(pokemon, info))
+
+    def clean_name(self, name):
+        """
+        Method to convert a name typed by the user to the name used by the API, eg. "Mr Mime" -> "mr-mime".
+        """
+        name = name.strip().lower().replace(" ", "-")
+        if len(name) > 0 and name[len(name)-1] == "-":
+            name = name.replace("-", "")
+        return name
+
+    def read_names(self, text):
+        """
+        Method to get the list of Pokémon names in a text with one name per line or separated by commas, without repetitions.
+        """
+        names = [self.clean_name(name) for line in text.splitlines() for name in line.split(",")]
+        return list(dict.fromkeys(name for name in names if name))  # Remove empty and repeated names, keeping their order
+
+    def resolve_many(self, names):
+        """
+        Method to resolve several Pokémon, fetching them concurrently (at most max_workers at a time).
+        Returns a dictionary with the details of each Pokémon.
+        """
+        infos = self.map_concurrently(self.resolve, names)
+        return dict(zip(names, infos))
+
+    def register_many(self, names):
+        """
+        Method to register several Pokémon at once.
+        The names already in the roster are skipped, the rest are resolved concurrently and saved in a single transaction.
+        Returns a dictionary with the lists of 'added', 'already_saved' and 'not_found' names, and 'failed' with the
+        (name, reason) of the ones that could not be looked up (eg. the PokéAPI was down), which may be tried again later.
+        """
+        names = list(dict.fromkeys(names))  # Remove repeated names
+        with self.metrics.timer('pokehub_storage_seconds', operation='saved_names'):
+            already_saved = self.storage.saved_names(names)
+        infos = self.resolve_many([name for name in names if name not in already_saved])  # Only fetch the new ones
+        found = [(name, info) for name, info in infos.items() if not info["notFound"]]
+        with self.metrics.timer('pokehub_storage_seconds', operation='register_many'):
+            added = self.storage.register_many([(self.pokemon_row(name, info), self.stats_row(name, info)) for name, info in found])
+        already_saved.update(name for name, _ in found if name not in added)  # Saved by another request while these were being resolved
+        return {
+            'added': added,
+            'already_saved': [name for name in names if name in already_saved],
+            'not_found': [name for name, info in infos.items() if info["notFound"] and info["error"] is None],
+            'failed': [(name, info["error"]) for name, info in infos.items() if info["notFound"] and info["error"] is not None]
+        }
+
+    def save_pokemon(self, pokemon, info=None):
+        """
+        Method to save a Pokémon's details to the roster.
+        The details returned by resolve can be passed in to avoid fetching the Pokémon again.
+        """
+        if info is None:
+            info = self.resolve(pokemon)  # Resolve the Pokémon details if they were not given
+        if info["notFound"]:
+            print("The Pokémon was not found.")
             return None
-        
+        with self.metrics.timer('pokehub_storage_seconds', operation='add_pokemon'):
+            self.storage.add_pokemon(self.pokemon_row(pokemon, info))  # Append the Pokémon to the roster
+
+    def get_pokemon_stats(self, name, info=None):
+        """
+        Method to save the pokemon stats to the roster.
+        The details returned by resolve can be passed in to avoid fetching the Pokémon again.
+        """
+        if info is None:
+            info = self.resolve(name.lower())  # Resolve the Pokémon details if they were not given
+        if info["notFound"]:
+            print(f"No information was found for the Pokémon {name.capitalize()}.")
+            return None
+        with self.metrics.timer('pokehub_storage_seconds', operation='add_stats'):
+            self.storage.add_stats(self.stats_row(name, info))  # Append the stats to the roster
+
+    def roster_version(self):
+        """
+        Method to get the roster version, a number that increases every time the roster changes, eg. to tell if a cached view is still valid.
+        """
+        return self.storage.version()
+
+    def roster_summary(self, top=10):
+        """
+        Method to get the aggregates of the roster (see RosterStore.summary): the number of Pokémon of each type,
+        the minimum, maximum, mean and histogram of each stat and the top Pokémon by total stats.
+        They are kept up to date as Pokémon are saved, so this doesn't depend on the size of the roster.
+        """
+        with self.metrics.timer('pokehub_storage_seconds', operation='summary'):
+            return self.storage.summary(top)
+
+    def pokemons_frame(self):
+        """
+        Method to get the details of every saved Pokémon as a DataFrame.
+        """
+        with self.metrics.timer('pokehub_storage_seconds', operation='pokemons'):
+            rows = self.storage.pokemons()
+        import pandas as pd  # Imported here, only the DataFrame methods need pandas
+        return pd.DataFrame(rows, columns=POKEMON_COLUMNS)
+
+    def stats_frame(self):
+        """
+        Method to get the stats of every saved Pokémon as a DataFrame, sorted from the highest to the lowest total stats.
+        The stats are read from the memory-mapped columns of the roster instead of the database.
+        """
+        with self.metrics.timer('pokehub_storage_seconds', operation='stats_columns'):
+            columns = self.storage.stats_columns()
+        order = columns.order()  # Row numbers sorted by total stats
+        data = {'name': np.array(columns.strings('names'), dtype=object)[order]}
+        for column in STATS_COLUMNS[1:7]:
+            data[column] = columns.column(column)[order]
+        data['image'] = np.array([image or None for image in columns.strings('images')], dtype=object)[order]  # Missing images are stored as empty strings
+        data['total'] = columns.total()[order]
+        import pandas as pd  # Imported here, only the DataFrame methods need pandas
+        return pd.DataFrame(data, columns=STATS_COLUMNS)
+
+    def query_stats(self, stat='total', limit=20, types=None, minimums=None, cursor=None):
+        """
+        Method to get a page of the registered Pokémon with the highest value of a stat (or 'total'), optionally filtered.
+        types keeps the Pokémon that have all the given types and minimums maps stats to their lowest allowed value, eg. {'speed': 100}.
+        cursor is the 'next' value of the previous page. Only the returned rows are sorted and read from the columns of the stats.
+        Returns a dictionary with the rows ('pokemons') and the cursor of the next page ('next', None on the last page).
+        Raises ValueError if a stat or the cursor is not valid.
+        """
+        with self.metrics.timer('pokehub_storage_seconds', operation='stats_columns'):
+            columns = self.storage.stats_columns()
+        after = None
+        if cursor:
+            try:
+                after = tuple(int(part) for part in cursor.split(':'))  # The value and row number of the last Pokémon of the previous page
+            except ValueError:
+                raise ValueError(f"Invalid cursor {cursor}.")
+            if len(after) != 2:
+                raise ValueError(f"Invalid cursor {cursor}.")
+        with self.metrics.timer('pokehub_storage_seconds', operation='query_stats'):
+            selected = columns.query(stat, limit + 1, types, minimums, after)  # One more row tells if there is a next page
+        values = columns.values(stat)
+        masks = columns.type_masks()
+        stats = {column: columns.column(column) for column in STATS_COLUMNS[1:7]}  # Mapped once, only the selected rows are read
+        pokemons = []
+        for row in selected[:limit].tolist():
+            pokemon = {'name': columns.string('names', row), 'type': columns.type_names(masks[row])}
+            pokemon.update({column: int(stats[column][row]) for column in stats})
+            pokemon['image'] = columns.string('images', row) or None
+            pokemon['total'] = sum(pokemon[column] for column in STATS_COLUMNS[1:7])
+            pokemons.append(pokemon)
+        last = int(selected[limit - 1]) if len(selected) > limit else None
+        return {'pokemons': pokemons, 'next': f"{int(values[last])}:{last}" if last is not None else None}
+
     def get_pokemon_info(self, name):
         """
         Method to get the pokemon stats.
         """
-        try:
-            url = f"{self.url}pokemon/{name.lower()}"#Get the url of the pokemon
-            response = requests.get(url)#Get the pokemon data
-            self.log_requests(response)#Log the request
-            if response.status_code == 200:#If the pokemon was found
-                data = response.json()#Get the pokemon data
-                stats = {stat['stat']['name']: stat['base_stat'] for stat in data['stats']}#Get the pokemon stats
-                return stats#Return the pokemon stats
-            else:
-                print(f"No information was found for the Pokémon {name.capitalize()}.")#Print a message if the pokemon was not found
-                return None#Return None
-        except requests.exceptions.RequestException as e:#If there was an error
-            print(f"There was a problem obtaining the data: {e}")#Print the error
-            return None#Return None
+        record = self.get_record(name.lower())  # Get the pokemon data
+        if record is None:
+            print(f"No information was found for the Pokémon {name.capitalize()}.")  # Print a message if the pokemon was not found
+            return None
+        return record.stats_dict()  # Return the pokemon stats
 
-    def show_pokemon_stats_graph(self, name):
+    def show_pokemon_stats_graph(self, name, info=None):
         """
         Method to show a bar graph of the statistics of a specific Pokémon.
+        The details returned by resolve can be passed in to avoid fetching the Pokémon again.
         """
-        pokemon_info = self.get_pokemon_info(name)  # Get the detailed information of the Pokémon
+        if info is not None:
+            pokemon_info = info.get("stats")  # Use the stats that were already resolved
+        else:
+            pokemon_info = self.get_pokemon_info(name)  # Get the detailed information of the Pokémon
         if pokemon_info:
             stats = pokemon_info  # Get the stats of the Pokémon
             # Plot stats
+            import plotly.graph_objects as go  # Imported here, only the graphs need plotly
             stats_fig = go.Figure(data=[go.Bar(x=list(stats.keys()), y=list(stats.values()))])  # Create a bar graph using plotly
             stats_fig.update_layout(title=f"{name.capitalize()}'s Statistics",
                                     xaxis_title="Statistic",
@@ -286,22 +739,14 @@ class PokemonGo():
         """
         Method to show a bar graph of the statistics of all Pokémon sort by highest total stats.
         """
-        try:
-            df= pd.read_csv('pokemons_stats.csv')  # Try to read the Pokémon data from the CSV file
-            total = df['hp'] + df['attack'] + df['defense'] + df['special_attack'] + df['special_defense'] + df['speed']  # Calculate the total stats of each Pokémon
-            df['total'] = total
-            df = df.sort_values(by=['total'], ascending=False)#sort the total stats from highest to lowest
-            df.to_csv('pokemons_stats.csv', index=False)  # Save the DataFrame to the CSV file
-            df = pd.read_csv('pokemons_stats.csv')  # Try to read the Pokémon data from the CSV file
-            total = df['total']#Get the total stats
-            stats_fig = go.Figure(data=[go.Bar(x=df['name'], y=total)])  # Create a bar graph using plotly
-            stats_fig.update_layout(title="Your Pokémon team Statistics",#set the title and axis labels
-                                    xaxis_title="Pokémon",
-                                    yaxis_title="Total Stats")
-            stats_fig.show()  # Show the bar graph
-        except FileNotFoundError:#If the file was not found
+        df = self.stats_frame()  # Get the Pokémon stats from the roster, already sorted by total
+        if df.empty:
             print("No Pokémon data was found.")#Print a message
             return None
-
-Api = PokemonGo()
-Api.createtypesdata()  # Create the types data if it doesn't exist
\ No newline at end of file
+        total = df['total']#Get the total stats
+        import plotly.graph_objects as go  # Imported here, only the graphs need plotly
+        stats_fig = go.Figure(data=[go.Bar(x=df['name'], y=total)])  # Create a bar graph using plotly
+        stats_fig.update_layout(title="Your Pokémon team Statistics",#set the title and axis labels
+                                xaxis_title="Pokémon",
+                                yaxis_title="Total Stats")
+        stats_fig.show()  # Show the bar graph
@@ -0,0 +1,137 @@
+import json  # Importing the json module for reading the API answers
+import threading  # Importing the threading module for adding new types safely
+from array import array  # Importing array for storing the stats as 6 small integers
+from urllib.parse import urlsplit  # Importing urlsplit for recognizing the URLs of the Pokémon details
+
+TYPE_NAMES = ['normal', 'fighting', 'flying', 'poison', 'ground', 'rock', 'bug', 'ghost', 'steel',
+              'fire', 'water', 'grass', 'electric', 'psychic', 'ice', 'dragon', 'dark', 'fairy']  # In the order of their PokéAPI ids, code = index + 1
+TYPE_CODES = {name: i + 1 for i, name in enumerate(TYPE_NAMES)}  # 0 means no type
+TYPE_BITS = 5  # Bits of each type in a type code, enough for 31 types
+STAT_NAMES = ['hp', 'attack', 'defense', 'special-attack', 'special-defense', 'speed']  # In the order of the stats array
+types_lock = threading.Lock()
+
+def type_code(name):
+    """
+    Function to get the code of a type, adding the types introduced after this list was written.
+    """
+    code = TYPE_CODES.get(name)
+    if code is None:
+        with types_lock:
+            code = TYPE_CODES.get(name)
+            if code is None:
+                if len(TYPE_NAMES) >= (1 << TYPE_BITS) - 1:
+                    raise ValueError(f"Too many types to encode {name}.")
+                TYPE_NAMES.append(name)
+                code = TYPE_CODES[name] = len(TYPE_NAMES)
+    return code
+
+def encode_types(types):
+    """
+    Function to pack one or two type names in a single integer, eg. ['grass', 'poison'] -> 12 | 4 << 5.
+    """
+    code = 0
+    for slot, name in enumerate(types[:2]):
+        code |= type_code(name) << (TYPE_BITS * slot)
+    return code
+
+def decode_types(code):
+    """
+    Function to get the type names packed in an integer by encode_types.
+    """
+    types = []
+    while code:
+        types.append(TYPE_NAMES[(code & ((1 << TYPE_BITS) - 1)) - 1])
+        code >>= TYPE_BITS
+    return types
+
+class PokemonRecord():
+    """
+    Class representing the parts of a Pokémon's API details used by the application: its types, stats and image.
+    Each record takes a few hundred bytes, so the whole Pokédex fits in memory.
+    """
+    __slots__ = ('id', 'name', 'type_code', 'stats', 'image')
+
+    def __init__(self, id, name, type_code, stats, image=None):
+        """
+        Constructor method to initialize the PokemonRecord object.
+        type_code holds the types (see encode_types) and stats the 6 base stats in the order of STAT_NAMES.
+        """
+        self.id = id
+        self.name = name
+        self.type_code = type_code
+        self.stats = array('H', stats)  # Unsigned 16-bit integers, base stats are below 256
+        self.image = image
+
+    @classmethod
+    def from_data(cls, data):
+        """
+        Method to build a record from the JSON details of a Pokémon, None if they don't have its types.
+        """
+        try:
+            types = [entry['type']['name'] for entry in sorted(data['types'], key=lambda entry: entry.get('slot', 0))]
+            stats = {entry['stat']['name']: entry['base_stat'] for entry in data.get('stats', [])}
+        except (KeyError, TypeError):
+            return None
+        if not types:
+            return None
+        return cls(data.get('id'), data.get('name'), encode_types(types), [stats.get(name, 0) for name in STAT_NAMES],
+                   (data.get('sprites') or {}).get('front_default'))
+
+    @classmethod
+    def from_json(cls, body):
+        """
+        Method to build a record from the body of an API answer. The parsed details are dropped as soon as the record is built.
+        """
+        try:
+            return cls.from_data(json.loads(body))
+        except ValueError:
+            return None
+
+    @property
+    def types(self):
+        """
+        Method to get the type names of the Pokémon.
+        """
+        return decode_types(self.type_code)
+
+    def stats_dict(self):
+        """
+        Method to get the stats as a dictionary with the names used by the API, eg. {'hp': 35, 'special-attack': 50, ...}.
+        """
+        return dict(zip(STAT_NAMES, self.stats))
+
+    def to_data(self):
+        """
+        Method to get the record in the shape of the API details, with only the fields the application uses.
+        """
+        return {
+            'id': self.id,
+            'name': self.name,
+            'types': [{'slot': slot + 1, 'type': {'name': name}} for slot, name in enumerate(self.types)],
+            'stats': [{'base_stat': value, 'stat': {'name': name}} for name, value in zip(STAT_NAMES, self.stats)],
+            'sprites': {'front_default': self.image}
+        }
+
+    def to_json(self):
+        """
+        Method to get the record as the compact JSON body stored in the cache.
+        """
+        return json.dumps(self.to_data(), separators=(',', ':')).encode('utf-8')
+
+    def __repr__(self):
+        return f"PokemonRecord({self.id!r}, {self.name!r}, {self.types!r}, {list(self.stats)!r})"
+
+def is_pokemon_url(url):
+    """
+    Function to check if a URL is the details of a single Pokémon, eg. .../pokemon/pikachu.
+    """
+    path = urlsplit(url).path.rstrip('/').split('/')
+    return len(path) >= 2 and path[-2] == 'pokemon'
+
+def compact_body(body):
+    """
+    Function to shrink the body of a Pokémon's details to the fields kept by PokemonRecord, the moves, games and other sprites are dropped.
+    Returns the body unchanged if it is not the details of a Pokémon.
+    """
+    record = PokemonRecord.from_json(body)
+    return record.to_json() if record is not None else body
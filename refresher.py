@@ -0,0 +1,174 @@
+import collections  # Importing the collections module for the queue of URLs
+import random  # Importing the random module for the jitter of the schedule
+import threading  # Importing the threading module for refreshing in the background
+import time  # Importing the time module for the rate budget
+
+class Refresher():
+    """
+    Class representing the background refresh of the expired responses of the cache (stale-while-revalidate).
+    Lookups answer the expired copy at once and schedule its URL here, a single background thread fetches them again
+    (with their ETag, so unchanged ones cost a 304) within a rate budget. Every interval seconds, give or take jitter,
+    it also looks for the expired responses nobody asked for, eg. the Pokémon kept in memory as records.
+    """
+
+    def __init__(self, pokedex, rate=1.0, burst=5, interval=300, jitter=0.2, batch=100):
+        """
+        Constructor method to initialize the Refresher object.
+        rate is the number of requests per second it may send to the API on average, burst the number it may send at once.
+        interval is the number of seconds between two looks for expired responses (batch of them at most) and jitter
+        the fraction by which that interval and the wait between two requests vary, so several processes don't refresh in step.
+        """
+        self.pokedex = pokedex
+        self.rate = rate
+        self.burst = burst
+        self.interval = interval
+        self.jitter = jitter
+        self.batch = batch
+        self.tokens = burst  # Requests that can be sent right now
+        self.updated = time.monotonic()  # When the tokens were last counted
+        self.pending = collections.deque()  # URLs waiting to be refreshed, in the order they were scheduled
+        self.scheduled = set()  # The same URLs, so each one is scheduled only once
+        self.lock = threading.Condition()
+        self.thread = None  # Started by the first schedule or sweep, creating the refresher does nothing
+        self.sweep_now = False
+        self.stopping = False
+        self.refreshed = 0  # Number of responses that changed
+        self.unchanged = 0  # Number of responses confirmed unchanged by the API
+        self.failed = 0  # Number of refreshes that failed, the expired copy is kept and refreshed later
+
+    def start(self):
+        """
+        Method to start the background thread, only once.
+        """
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+        return self.thread
+
+    def schedule(self, url):
+        """
+        Method to ask for a URL to be refreshed in the background, without waiting for it.
+        """
+        with self.lock:
+            if url not in self.scheduled:
+                self.scheduled.add(url)
+                self.pending.append(url)
+                self.lock.notify()
+        self.start()
+
+    def sweep(self):
+        """
+        Method to look for the expired responses now instead of at the next interval, eg. after they were invalidated.
+        """
+        with self.lock:
+            self.sweep_now = True
+            self.lock.notify()
+        self.start()
+
+    def queued(self):
+        """
+        Method to get the number of URLs waiting to be refreshed.
+        """
+        with self.lock:
+            return len(self.pending)
+
+    def delay(self, seconds):
+        """
+        Method to vary a number of seconds by up to jitter in either direction.
+        """
+        return seconds * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def take(self):
+        """
+        Method to wait until the rate budget allows one more request. Returns False if the refresher was stopped meanwhile.
+        """
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)  # The budget fills up at rate tokens per second
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            with self.lock:
+                if self.stopping:
+                    return False
+                self.lock.wait(self.delay((1 - self.tokens) / self.rate))
+
+    def run(self):
+        """
+        Method run by the background thread: it refreshes the scheduled URLs one at a time and looks for expired ones every interval.
+        """
+        next_sweep = time.monotonic()  # The first look is right away
+        more = False  # The last look found a full batch, the next one is made as soon as it is refreshed
+        failed = self.failed
+        while True:
+            with self.lock:
+                if more and not self.pending:
+                    self.sweep_now = self.failed == failed  # Unless some failed, they would be found again at once
+                    more = False
+                while not self.stopping and not self.pending and not self.sweep_now and time.monotonic() < next_sweep:
+                    self.lock.wait(next_sweep - time.monotonic())
+                if self.stopping:
+                    return
+                sweeping = self.sweep_now or time.monotonic() >= next_sweep
+            if sweeping:
+                next_sweep = time.monotonic() + self.delay(self.interval)
+                try:
+                    urls = self.pokedex.cache.expired(self.batch)
+                except Exception as e:
+                    print(f"There was a problem looking for expired data: {e}")
+                    urls = []
+                for url in urls:
+                    self.schedule(url)
+                more, failed = len(urls) == self.batch, self.failed
+                with self.lock:
+                    self.sweep_now = False  # Only now, so wait() doesn't return before the expired responses are scheduled
+                continue
+            if not self.take():
+                return
+            with self.lock:
+                url = self.pending.popleft()
+            try:
+                changed = self.pokedex.refresh(url)
+                if changed is not None:
+                    self.count('changed' if changed else 'unchanged')
+                else:
+                    self.count('failed')
+            except Exception as e:  # The thread must keep running, the URL is scheduled again by its next lookup
+                self.count('failed')
+                print(f"There was a problem refreshing {url}: {e}")
+            finally:
+                with self.lock:
+                    self.scheduled.discard(url)  # Lookups of the URL can schedule it again from now on
+
+    def count(self, result):
+        """
+        Method to count the result of a refresh, also in the metrics of the application.
+        """
+        field = {'changed': 'refreshed', 'unchanged': 'unchanged', 'failed': 'failed'}[result]
+        setattr(self, field, getattr(self, field) + 1)
+        self.pokedex.metrics.inc('pokehub_refresh_total', result=result)
+
+    def wait(self, timeout=None):
+        """
+        Method to wait until every scheduled URL was refreshed (and the expired responses found by a sweep asked for). Returns False if timeout seconds passed first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                if not self.scheduled and not self.sweep_now:
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
+    def stop(self):
+        """
+        Method to stop the background thread, the URLs still scheduled are not refreshed.
+        """
+        with self.lock:
+            self.stopping = True
+            self.lock.notify_all()
+        if self.thread is not None:
+            self.thread.join()
@@ -0,0 +1,190 @@
+import atexit  # Importing the atexit module for writing the last records when the program ends
+import collections  # Importing the collections module for the records kept in memory
+import datetime  # Importing the datetime module for the time of each record
+import json  # Importing the json module for writing one JSON object per line
+import os  # Importing the os module for rotating the log files
+import queue  # Importing the queue module for handing the records to the writer thread
+import threading  # Importing the threading module for the writer thread
+import time  # Importing the time module for the age of the log file
+
+class JsonLinesLog():
+    """
+    Class representing a request log written as JSON lines (one object per request) by a background thread.
+    log never blocks: records wait in a bounded queue and are dropped (and counted) if the writer falls behind.
+    """
+
+    def __init__(self, path='log.jsonl', max_bytes=10 * 1024 * 1024, max_age=24 * 60 * 60, backups=5, queue_size=10000, flush_interval=1.0):
+        """
+        Constructor method to initialize the JsonLinesLog object.
+        The file is rotated to path.1, path.2... (keeping backups old files) when it is bigger than max_bytes or older than max_age seconds.
+        Records are written in batches at least every flush_interval seconds.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.records = queue.Queue(maxsize=queue_size)
+        self.dropped = 0  # Number of records dropped because the queue was full
+        self.file = None
+        self.opened_at = None
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def log(self, **fields):
+        """
+        Method to add a record to the log without waiting for it to be written.
+        """
+        record = {'time': datetime.datetime.now().isoformat(timespec='milliseconds')}
+        record.update(fields)
+        if self.thread is None:
+            self.start()
+        try:
+            self.records.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1  # Losing a log line is better than slowing down a request
+
+    def start(self):
+        """
+        Method to start the writer thread, only once.
+        """
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='request-log', daemon=True)
+                self.thread.start()
+                atexit.register(self.close)  # Write the records still in the queue when the program ends
+
+    def run(self):
+        """
+        Method run by the writer thread: it takes every record waiting in the queue and writes them at once.
+        """
+        while True:
+            try:
+                batch = [self.records.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while True:
+                try:
+                    batch.append(self.records.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is None  # close() puts None in the queue
+            records = [record for record in batch if record is not None]
+            if records:
+                self.write(records)
+            for _ in batch:
+                self.records.task_done()
+            if stop:
+                break
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def write(self, records):
+        """
+        Method to write a batch of records with a single write call, rotating the file first if needed.
+        """
+        try:
+            self.open()
+            self.file.write(''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in records))
+            self.file.flush()
+        except OSError as e:
+            print(f"The request log could not be written: {e}")
+
+    def open(self):
+        """
+        Method to open the log file, or open it again if it was rotated by another process or must be rotated now.
+        """
+        if self.file is not None:
+            try:
+                stat = os.stat(self.path)
+                moved = stat.st_ino != os.fstat(self.file.fileno()).st_ino  # Another process rotated or deleted it
+            except FileNotFoundError:
+                moved = True
+            if moved:
+                self.file.close()
+                self.file = None
+            elif stat.st_size >= self.max_bytes or time.time() - self.opened_at >= self.max_age:
+                self.rotate()
+        if self.file is None:
+            self.file = open(self.path, 'a', encoding='utf-8')
+            self.opened_at = time.time()
+
+    def rotate(self):
+        """
+        Method to rename the log file to path.1, shifting the older files and deleting the oldest one.
+        """
+        self.file.close()
+        self.file = None
+        for number in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{number}"):
+                os.replace(f"{self.path}.{number}", f"{self.path}.{number + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def flush(self):
+        """
+        Method to wait until every record logged so far has been written.
+        """
+        if self.thread is not None and self.thread.is_alive():
+            self.records.join()
+
+    def close(self):
+        """
+        Method to write the records still in the queue and stop the writer thread.
+        """
+        if self.thread is not None and self.thread.is_alive():
+            self.records.put(None)
+            self.thread.join()
+
+    def clear(self):
+        """
+        Method to delete the log file and its rotated copies. Returns the number of files that were deleted.
+        """
+        self.flush()
+        deleted = 0
+        for path in [self.path] + [f"{self.path}.{number}" for number in range(1, self.backups + 1)]:
+            try:
+                os.remove(path)
+                deleted += 1
+            except FileNotFoundError:
+                pass
+        return deleted
+
+class MemoryLog():
+    """
+    Class representing a request log kept in memory, a drop-in replacement of JsonLinesLog for tests.
+    """
+
+    def __init__(self, maxlen=None):
+        """
+        Constructor method to initialize the MemoryLog object, keeping the last maxlen records (all of them by default).
+        """
+        self.records = collections.deque(maxlen=maxlen)
+        self.dropped = 0
+
+    def log(self, **fields):
+        """
+        Method to add a record to the log.
+        """
+        self.records.append(fields)
+
+    def flush(self):
+        """
+        Method kept for compatibility with JsonLinesLog, the records are always up to date.
+        """
+
+    def close(self):
+        """
+        Method kept for compatibility with JsonLinesLog.
+        """
+
+    def clear(self):
+        """
+        Method to delete every record. Returns the number of records that were deleted.
+        """
+        deleted = len(self.records)
+        self.records.clear()
+        return deleted
@@ -0,0 +1,114 @@
+import contextlib  # Importing the contextlib module for the lock context manager
+import errno  # Importing the errno module for recognizing the deadlock errors of the lock file
+import hashlib  # Importing the hashlib module for spreading the keys over the lock stripes
+import os  # Importing the os module for opening the lock file
+import threading  # Importing the threading module for the calls in flight
+import time  # Importing the time module for waiting before locking the lock file again
+try:
+    import fcntl  # Importing the fcntl module for locking the lock file, only available on Unix
+except ImportError:
+    fcntl = None
+
+LOCK_STRIPES = 1024  # Number of byte ranges of the lock file, keys that share one wait for each other
+DEADLOCK_RETRY = 0.01  # Seconds to wait before locking a stripe again when the system reports a deadlock
+
+class Call():
+    """
+    Class representing a call in flight, whose result is shared by every caller that asked for the same key.
+    """
+
+    def __init__(self):
+        """
+        Constructor method to initialize the Call object.
+        """
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0  # Number of callers that waited for this call instead of making it
+
+class SingleFlight():
+    """
+    Class representing a group of calls where concurrent callers asking for the same key share a single call.
+    Within a process, the first caller runs the function and the others wait for its result (or its exception).
+    With lock_path, processes sharing that file (eg. the workers of the web application) also take turns per key,
+    so the first one fills a shared cache and the others find the result there instead of making the same call.
+    """
+
+    def __init__(self, lock_path=None):
+        """
+        Constructor method to initialize the SingleFlight object.
+        lock_path is the file locked between processes, None (or a system without fcntl) only coalesces calls within the process.
+        """
+        self.calls = {}  # Key -> Call in flight
+        self.lock = threading.Lock()
+        self.lock_path = lock_path if fcntl is not None else None
+        self.lock_file = None  # Opened on the first call that needs it
+        self.stripes = [threading.Lock() for _ in range(LOCK_STRIPES)]  # Threads of this process take turns per stripe too
+        self.shared = 0  # Number of callers that got the result of another caller's call
+
+    def do(self, key, function):
+        """
+        Method to call function() once for all the concurrent callers with the same key.
+        Returns a tuple (result, shared): shared is True when the result comes from a call made by another caller.
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = Call()
+            else:
+                call.waiters += 1
+                self.shared += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]  # Callers arriving from now on make a new call
+            call.done.set()
+        return call.result, False
+
+    def open(self):
+        """
+        Method to open the lock file, only once.
+        """
+        with self.lock:
+            if self.lock_file is None:
+                self.lock_file = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        return self.lock_file
+
+    @contextlib.contextmanager
+    def process_lock(self, key):
+        """
+        Method to hold the lock of a key between processes during a with block. Yields True if a lock was taken.
+        The lock is a byte range of the lock file chosen by the hash of the key. POSIX locks belong to the process, not the thread,
+        so two threads with keys of the same stripe first take turns on a lock of the stripe in this process: otherwise the first
+        one to finish would unlock the range while the other still fetches.
+        """
+        if self.lock_path is None:
+            yield False
+            return
+        stripe = int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=4).digest(), 'big') % LOCK_STRIPES
+        fd = self.open()
+        with self.stripes[stripe]:
+            while True:
+                try:
+                    fcntl.lockf(fd, fcntl.LOCK_EX, 1, stripe)  # Waits while another process fetches a key of this stripe
+                    break
+                except OSError as e:
+                    if e.errno != errno.EDEADLK:
+                        raise
+                    # The system sees two processes each waiting for a stripe the other holds, but the holders are other threads
+                    # that never wait for a second stripe, so it is not a real deadlock: they finish and the lock can be tried again
+                    time.sleep(DEADLOCK_RETRY)
+            try:
+                yield True
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN, 1, stripe)
@@ -0,0 +1,127 @@
+import json  # Importing the json module for encoding the stored resources
+import os  # Importing the os module for replacing the pack file
+import sqlite3  # Importing the sqlite3 module for the data pack
+import threading  # Importing the threading module for per-thread database connections
+import zlib  # Importing the zlib module for compressing the stored resources
+from urllib.parse import urlsplit, parse_qs  # Importing the URL parsing functions
+from cache import make_response  # Importing the function that builds requests responses
+
+class PokedexPack():
+    """
+    Class representing a local data pack with every Pokémon and type of the PokéAPI, used by the offline mode.
+    The resources are stored compressed in a SQLite database indexed by name and id.
+    """
+
+    def __init__(self, path='pokedex.pack'):
+        """
+        Constructor method to initialize the PokedexPack object from an existing pack file.
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"The data pack {path} was not found, create it with the snapshot command.")
+        self.path = path
+        self.local = threading.local()
+
+    def connection(self):
+        """
+        Method to get the read-only database connection of the current thread.
+        """
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            db.row_factory = sqlite3.Row
+            self.local.db = db
+        return db
+
+    @classmethod
+    def build(cls, path, type_index, types, pokemons):
+        """
+        Method to create a pack file from the /type answer, the details of every type and the details of every Pokémon.
+        The pack is written to a temporary file first, so a running application never sees it half written.
+        """
+        temporary = path + '.tmp'
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        db = sqlite3.connect(temporary)
+        with db:
+            db.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, data BLOB)")
+            db.execute("CREATE TABLE types (id INTEGER PRIMARY KEY, name TEXT UNIQUE, data BLOB)")
+            db.execute("CREATE TABLE pokemon (id INTEGER PRIMARY KEY, name TEXT UNIQUE, types TEXT, data BLOB)")  # UNIQUE creates the index on the name
+            db.execute("INSERT INTO meta VALUES ('type_index', ?)", (cls.pack_data(type_index),))
+            db.executemany("INSERT OR REPLACE INTO types VALUES (?, ?, ?)",
+                           [(type['id'], type['name'], cls.pack_data(type)) for type in types])
+            db.executemany("INSERT OR REPLACE INTO pokemon VALUES (?, ?, ?, ?)",
+                           [(pokemon['id'], pokemon['name'], ','.join(t['type']['name'] for t in pokemon['types']), cls.pack_data(pokemon)) for pokemon in pokemons])
+        db.execute("VACUUM")
+        db.close()
+        os.replace(temporary, path)
+        return cls(path)
+
+    @staticmethod
+    def pack_data(data):
+        """
+        Method to compress a resource for storing it in the pack.
+        """
+        return zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+
+    @staticmethod
+    def unpack_data(blob):
+        """
+        Method to decompress a resource stored in the pack, returning its JSON bytes.
+        """
+        return zlib.decompress(blob)
+
+    def lookup(self, table, key):
+        """
+        Method to get the compressed data of a resource by name or id.
+        """
+        column = 'id' if key.isdigit() else 'name'
+        row = self.connection().execute(f"SELECT data FROM {table} WHERE {column} = ?", (int(key) if key.isdigit() else key,)).fetchone()
+        return row['data'] if row else None
+
+    def pokemon_list(self, base_url, query):
+        """
+        Method to build the answer of the paginated /pokemon list.
+        """
+        limit = int(query.get('limit', ['20'])[0])
+        offset = int(query.get('offset', ['0'])[0])
+        db = self.connection()
+        count = db.execute("SELECT COUNT(*) FROM pokemon").fetchone()[0]
+        rows = db.execute("SELECT id, name FROM pokemon ORDER BY id LIMIT ? OFFSET ?", (limit, offset))
+        return {'count': count, 'results': [{'name': row['name'], 'url': f"{base_url}pokemon/{row['id']}/"} for row in rows]}
+
+    def response(self, url, base_url):
+        """
+        Method to answer a GET request of the PokéAPI from the pack.
+        Returns a requests Response object, with status 404 if the resource is not in the pack.
+        """
+        parts = urlsplit(url)
+        path = parts.path.strip('/').split('/')
+        body = None
+        if path[-1] in ('pokemon', 'type'):  # A list of resources
+            if path[-1] == 'type':
+                blob = self.connection().execute("SELECT data FROM meta WHERE key = 'type_index'").fetchone()
+                body = self.unpack_data(blob['data']) if blob else None
+            else:
+                body = json.dumps(self.pokemon_list(base_url, parse_qs(parts.query))).encode('utf-8')
+        elif len(path) >= 2 and path[-2] in ('pokemon', 'type'):  # A single resource, by name or id
+            blob = self.lookup('types' if path[-2] == 'type' else 'pokemon', path[-1].lower())
+            body = self.unpack_data(blob) if blob else None
+        if body is None:
+            return make_response(url, 404, b'Not Found', 'text/plain')
+        return make_response(url, 200, body, 'application/json; charset=utf-8')
+
+    def species(self):
+        """
+        Method to get the name and type(s) of every Pokémon in the pack.
+        """
+        return [(row['name'], row['types'].split(',')) for row in self.connection().execute("SELECT name, types FROM pokemon ORDER BY id")]
+
+def environment_pack():
+    """
+    Function to open the data pack named by the POKEHUB_OFFLINE environment variable, or return None to work online.
+    POKEHUB_OFFLINE=1 uses the default pokedex.pack file.
+    """
+    path = os.environ.get('POKEHUB_OFFLINE')
+    if not path:
+        return None
+    return PokedexPack('pokedex.pack' if path == '1' else path)
@@ -0,0 +1,80 @@
+// Draws the table of /show_all and the graph of /show_stats from the JSON data of /api/pokemons.json and /api/stats.json.
+// The data is cached by the browser and revalidated with its ETag, so an unchanged page is answered with 304.
+
+function nextPageUrl(parameter, value) {
+    // Same page with the position (or cursor) of the next page in the query string
+    const url = new URL(window.location.href);
+    url.searchParams.set(parameter, value);
+    return url.toString();
+}
+
+function showNextPage(parameter, value) {
+    const link = document.getElementById('next-page');
+    if (value !== null && value !== undefined) {
+        link.querySelector('a').href = nextPageUrl(parameter, value);
+        link.hidden = false;
+    }
+}
+
+function showMessage(text) {
+    const message = document.createElement('p');
+    message.className = 'message';
+    message.textContent = text;
+    document.getElementById('messages').appendChild(message);
+}
+
+async function loadData(element) {
+    const response = await fetch(element.dataset.src, {cache: 'no-cache'});  // Revalidated with If-None-Match
+    const data = await response.json();
+    if (!response.ok) {
+        showMessage(data.error || 'The data could not be loaded.');
+        return null;
+    }
+    return data;
+}
+
+async function drawTable(element) {
+    const data = await loadData(element);
+    if (!data || !data.cells[0].length) {
+        return;
+    }
+    Plotly.newPlot(element, [{
+        type: 'table',
+        header: {values: data.columns, fill: {color: 'paleturquoise'}, align: 'left'},
+        cells: {values: data.cells, fill: {color: 'lavender'}, align: 'left'}
+    }]);
+    showNextPage('after', data.next);
+}
+
+async function drawStats(element) {
+    const data = await loadData(element);
+    if (!data || !data.names.length) {
+        return;
+    }
+    Plotly.newPlot(element, [{type: 'bar', x: data.names, y: data.values}], {
+        title: {text: 'Your Pokémon team Statistics'},
+        xaxis: {title: {text: 'Pokémon'}},
+        yaxis: {title: {text: data.label}}
+    });
+    const images = document.getElementById('pokemon-images');
+    data.images.forEach((image, i) => {
+        const container = document.createElement('div');
+        const img = document.createElement('img');
+        img.src = image || '';
+        img.alt = data.names[i];
+        container.appendChild(img);
+        images.appendChild(container);
+    });
+    showNextPage('cursor', data.next);
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    const table = document.getElementById('pokemons-table');
+    if (table) {
+        drawTable(table);
+    }
+    const stats = document.getElementById('stats-graph');
+    if (stats) {
+        drawStats(stats);
+    }
+});
@@ -0,0 +1,409 @@
+import csv  # Importing the csv module for importing the CSV files of older versions
+import os  # Importing the os module for renaming the imported CSV files
+import sqlite3  # Importing the sqlite3 module for storing the roster on disk
+import threading  # Importing the threading module for per-thread database connections
+from columnar import StatsColumns, STAT_COLUMNS  # Importing the memory-mapped columnar copy of the stats
+
+POKEMON_COLUMNS = ['name', 'type', 'weakness', 'resistance', 'advantage']
+STATS_COLUMNS = ['name', 'hp', 'attack', 'defense', 'special_attack', 'special_defense', 'speed', 'image', 'total']
+INSERT_POKEMON = "INSERT OR REPLACE INTO pokemons VALUES (:name, :type, :weakness, :resistance, :advantage)"
+INSERT_POKEMON_IF_ABSENT = "INSERT OR IGNORE INTO pokemons VALUES (:name, :type, :weakness, :resistance, :advantage)"
+INSERT_STATS = """INSERT OR REPLACE INTO pokemons_stats VALUES (:name, :hp, :attack, :defense, :special_attack, :special_defense, :speed, :image,
+    CAST(:hp AS INTEGER) + CAST(:attack AS INTEGER) + CAST(:defense AS INTEGER) + CAST(:special_attack AS INTEGER) + CAST(:special_defense AS INTEGER) + CAST(:speed AS INTEGER))"""
+INSERT_STATS_IF_ABSENT = INSERT_STATS.replace("INSERT OR REPLACE", "INSERT OR IGNORE", 1)
+BUMP_VERSION = "UPDATE meta SET value = value + 1 WHERE key = 'version'"
+BUMP_REWRITES = "UPDATE meta SET value = value + 1 WHERE key = 'rewrites'"  # Saved stats were changed or deleted, not only added
+AGGREGATE_STATS = STATS_COLUMNS[1:7] + ['total']  # Stats with a running count, sum, minimum, maximum and histogram
+HISTOGRAM_WIDTHS = {'total': 50}  # Width of the histogram buckets of a stat, eg. 40-49 for the base stats and 300-349 for the total
+HISTOGRAM_WIDTH = 10
+ADD_TYPES = "INSERT INTO type_counts VALUES (?, ?) ON CONFLICT (type) DO UPDATE SET count = count + excluded.count"
+ADD_STATS = """INSERT INTO stat_aggregates VALUES (?, ?, ?, ?, ?) ON CONFLICT (stat) DO UPDATE SET
+    count = count + excluded.count, sum = sum + excluded.sum, min = MIN(min, excluded.min), max = MAX(max, excluded.max)"""
+ADD_BUCKETS = "INSERT INTO stat_histograms VALUES (?, ?, ?) ON CONFLICT (stat, bucket) DO UPDATE SET count = count + excluded.count"
+ADD_COUNT = "UPDATE meta SET value = value + ? WHERE key = 'pokemons'"
+
+class RosterStore():
+    """
+    Class representing the storage of the registered Pokémon and their stats in a SQLite database.
+    """
+
+    def __init__(self, path='pokehub.db', synchronous='NORMAL', columns_path=None, migrate=False):
+        """
+        Constructor method to initialize the RosterStore object.
+        synchronous is the SQLite fsync policy: 'NORMAL' syncs at checkpoints, 'FULL' syncs on every commit.
+        columns_path is the directory of the columnar copy of the stats, by default pokehub.columns next to the database.
+        With migrate=True the CSV files of older versions are imported when the database is first opened (see migrate_csv).
+        The database is only opened by the first read or write, so creating the store doesn't touch the disk.
+        """
+        self.path = path
+        self.synchronous = synchronous
+        self.columns_path = columns_path if columns_path is not None else os.path.splitext(path)[0] + '.columns'
+        self.columns = None  # Opened on the first write or read of the stats
+        self.columns_lock = threading.Lock()
+        self.local = threading.local()
+        self.migrate = migrate
+        self.ready = False  # Set once the tables exist
+        self.lock = threading.Lock()
+
+    def create_tables(self, db):
+        """
+        Method to create the tables of the roster if they don't exist yet (and import the CSV files of older versions), once per process.
+        """
+        with self.lock:
+            if self.ready:
+                return  # Another thread created them while this one was waiting
+            with db:
+                db.execute("""CREATE TABLE IF NOT EXISTS pokemons (
+                    name TEXT PRIMARY KEY,
+                    type TEXT,
+                    weakness TEXT,
+                    resistance TEXT,
+                    advantage TEXT
+                )""")
+                db.execute("""CREATE TABLE IF NOT EXISTS pokemons_stats (
+                    name TEXT PRIMARY KEY,
+                    hp INTEGER,
+                    attack INTEGER,
+                    defense INTEGER,
+                    special_attack INTEGER,
+                    special_defense INTEGER,
+                    speed INTEGER,
+                    image TEXT,
+                    total INTEGER
+                )""")
+                columns = [row['name'] for row in db.execute("PRAGMA table_info(pokemons_stats)")]
+                if 'total' not in columns:  # Databases created by older versions don't have the precomputed total
+                    db.execute("ALTER TABLE pokemons_stats ADD COLUMN total INTEGER")
+                    db.execute("UPDATE pokemons_stats SET total = hp + attack + defense + special_attack + special_defense + speed")
+                db.execute("CREATE INDEX IF NOT EXISTS pokemons_stats_total ON pokemons_stats (total DESC)")  # Keeps the ranking sorted as rows are inserted
+                db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+                db.execute("INSERT OR IGNORE INTO meta VALUES ('version', 0)")
+                db.execute("INSERT OR IGNORE INTO meta VALUES ('rewrites', 0)")
+                db.execute("CREATE TABLE IF NOT EXISTS type_counts (type TEXT PRIMARY KEY, count INTEGER NOT NULL)")
+                db.execute("""CREATE TABLE IF NOT EXISTS stat_aggregates (
+                    stat TEXT PRIMARY KEY,
+                    count INTEGER NOT NULL,
+                    sum INTEGER NOT NULL,
+                    min INTEGER,
+                    max INTEGER
+                )""")
+                db.execute("""CREATE TABLE IF NOT EXISTS stat_histograms (
+                    stat TEXT,
+                    bucket INTEGER,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (stat, bucket)
+                )""")
+                if db.execute("INSERT OR IGNORE INTO meta VALUES ('pokemons', 0)").rowcount:  # Databases created by older versions have no aggregates yet
+                    self.rebuild_aggregates(db)
+                self.sync_columns(db)  # Columns written by older versions (or missing) are brought up to date once, reads never write them
+            if self.migrate:
+                self.migrate_csv()  # Uses the connection of this thread, which already exists
+            self.ready = True
+
+    def connection(self):
+        """
+        Method to get the database connection of the current thread, creating the tables on the first one.
+        """
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level='IMMEDIATE')  # Writes take the database lock when their transaction starts, other processes wait for it
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")  # Append new rows to the write-ahead log instead of rewriting the database
+            db.execute(f"PRAGMA synchronous={self.synchronous}")
+            self.local.db = db
+            if not self.ready:
+                try:
+                    self.create_tables(db)
+                except sqlite3.Error:
+                    self.local.db = None  # Try again with a new connection next time
+                    db.close()
+                    raise
+        return db
+
+    def version(self):
+        """
+        Method to get the roster version, a number that increases every time the roster changes.
+        """
+        return self.connection().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def has_pokemon(self, name):
+        """
+        Method to check if a Pokémon is already saved, using the index on its name.
+        """
+        return self.connection().execute("SELECT 1 FROM pokemons WHERE name = ?", (name,)).fetchone() is not None
+
+    def add_pokemon(self, row):
+        """
+        Method to save the details of a Pokémon, replacing them if it was already saved.
+        """
+        with self.connection() as db:
+            if db.execute(INSERT_POKEMON_IF_ABSENT, row).rowcount == 1:  # The first write starts the transaction, so no other process saves it meanwhile
+                self.aggregate(db, [row], [])
+            else:
+                db.execute(INSERT_POKEMON, row)
+                self.rebuild_aggregates(db)  # The counts of the replaced type(s) can't be taken back one by one
+            db.execute(BUMP_VERSION)
+            db.execute(BUMP_REWRITES)  # The type(s) may replace saved ones
+            self.sync_columns(db)
+
+    def add_stats(self, row):
+        """
+        Method to save the stats of a Pokémon, replacing them if they were already saved.
+        """
+        with self.connection() as db:
+            if db.execute(INSERT_STATS_IF_ABSENT, row).rowcount == 1:  # The first write starts the transaction, so no other process saves it meanwhile
+                self.aggregate(db, [], [row])
+            else:
+                db.execute(INSERT_STATS, row)
+                self.rebuild_aggregates(db)  # The minimum and maximum of the replaced stats can't be taken back
+            db.execute(BUMP_VERSION)
+            db.execute(BUMP_REWRITES)  # The stats may replace saved ones
+            self.sync_columns(db)
+
+    def register(self, pokemon_row, stats_row):
+        """
+        Method to save the details and stats of a Pokémon in a single transaction, only if it isn't already saved.
+        Returns True if the Pokémon was saved, False if it was already in the roster.
+        """
+        with self.connection() as db:
+            if db.execute(INSERT_POKEMON_IF_ABSENT, pokemon_row).rowcount == 0:
+                return False  # Another request (or process) saved it first
+            self.save_new_stats(db, [pokemon_row], [stats_row])
+        return True
+
+    def register_many(self, rows):
+        """
+        Method to save the details and stats of several Pokémon in a single transaction, skipping the ones already saved.
+        rows is a list of (pokemon_row, stats_row) tuples. Returns the names of the Pokémon that were saved.
+        """
+        saved = []
+        with self.connection() as db:
+            for pokemon_row, stats_row in rows:
+                if db.execute(INSERT_POKEMON_IF_ABSENT, pokemon_row).rowcount == 1:
+                    saved.append((pokemon_row, stats_row))
+            if saved:
+                self.save_new_stats(db, [pokemon_row for pokemon_row, _ in saved], [stats_row for _, stats_row in saved])
+        return [pokemon_row['name'] for pokemon_row, _ in saved]
+
+    def save_new_stats(self, db, pokemon_rows, stats_rows):
+        """
+        Method to save the stats of Pokémon whose details were just saved, and add them to the aggregates and the columns.
+        Stats saved before without details (see add_stats) are replaced, which is counted as a rewrite.
+        """
+        replaced = False
+        for row in stats_rows:
+            if db.execute(INSERT_STATS_IF_ABSENT, row).rowcount == 0:
+                db.execute(INSERT_STATS, row)
+                replaced = True
+        if replaced:
+            self.rebuild_aggregates(db)  # The replaced stats can't be taken back one by one
+            db.execute(BUMP_REWRITES)
+        else:
+            self.aggregate(db, pokemon_rows, stats_rows)
+        db.execute(BUMP_VERSION)
+        self.sync_columns(db)
+
+    def saved_names(self, names):
+        """
+        Method to get which of the given names are already saved, using the index on the name.
+        """
+        saved = set()
+        names = list(names)
+        for start in range(0, len(names), 500):  # Query in chunks to stay below the SQLite parameter limit
+            chunk = names[start:start + 500]
+            query = f"SELECT name FROM pokemons WHERE name IN ({', '.join('?' * len(chunk))})"
+            saved.update(row['name'] for row in self.connection().execute(query, chunk))
+        return saved
+
+    def set_images(self, images):
+        """
+        Method to save the image URLs of several Pokémon given as a dictionary name -> URL.
+        """
+        with self.connection() as db:
+            db.executemany("UPDATE pokemons_stats SET image = ? WHERE name = ?", [(image, name) for name, image in images.items()])
+            db.execute(BUMP_VERSION)
+            db.execute(BUMP_REWRITES)
+            self.sync_columns(db)
+
+    def pokemons(self):
+        """
+        Method to get the details of every saved Pokémon, in the order they were registered.
+        """
+        return [dict(row) for row in self.connection().execute("SELECT * FROM pokemons ORDER BY rowid")]
+
+    def stats(self):
+        """
+        Method to get the stats of every saved Pokémon, sorted from the highest to the lowest total stats.
+        """
+        return [dict(row) for row in self.connection().execute("SELECT * FROM pokemons_stats ORDER BY total DESC")]  # Read in the order of the total index, no sorting needed
+
+    def open_columns(self):
+        """
+        Method to get the columnar copy of the stats (see StatsColumns), opening it only once.
+        """
+        with self.columns_lock:  # Not self.lock, which create_tables holds while it syncs the columns
+            if self.columns is None:
+                self.columns = StatsColumns(self.columns_path)
+        return self.columns
+
+    def sync_columns(self, db):
+        """
+        Method to bring the columns up to date with the roster, in the transaction that changed it (which holds the write lock,
+        so no other process writes the columns meanwhile). New Pokémon are appended to the columns,
+        the columns are only rebuilt after saved stats were changed or deleted (every write that does it bumps the rewrites).
+        """
+        columns = self.open_columns()
+        state = dict(db.execute("SELECT key, value FROM meta WHERE key IN ('version', 'rewrites')").fetchall())
+        meta = columns.load_meta()  # Only the description, the writer never maps the columns
+        if meta['version'] == state['version'] and meta['rewrites'] == state['rewrites']:
+            return  # Already up to date
+        select = f"""SELECT pokemons_stats.rowid, pokemons_stats.name, image, type, {', '.join(STAT_COLUMNS)}
+            FROM pokemons_stats LEFT JOIN pokemons ON pokemons.name = pokemons_stats.name"""
+        rebuild = meta['rewrites'] != state['rewrites'] or meta['generation'] == 0  # An empty store (or one written by older versions) has no files yet
+        rows = db.execute(select + " WHERE pokemons_stats.rowid > ? ORDER BY pokemons_stats.rowid", (0 if rebuild else meta['rowid'],)).fetchall()  # Only the new rows
+        if rebuild:
+            columns.reset()
+        state['rowid'] = rows[-1]['rowid'] if rows else (0 if rebuild else meta['rowid'])
+        columns.append(rows, state)
+
+    def stats_columns(self):
+        """
+        Method to get the stats as memory-mapped columns, kept up to date by every write to the roster.
+        It only reads the description of the columns, so it never waits for a write or writes anything.
+        Returns a ColumnsSnapshot: it doesn't change while it is read, even if Pokémon are saved meanwhile.
+        """
+        self.connection()  # The first connection of the process brings columns left behind by older versions up to date
+        return self.open_columns().read_meta()  # Another process may have updated the columns
+
+    def pokemons_page(self, after=0, limit=50):
+        """
+        Method to get the details of the Pokémon registered after the given position, in the order they were registered.
+        Returns the rows and the position to pass to get the next page (None on the last page).
+        """
+        rows = self.connection().execute("SELECT rowid, * FROM pokemons WHERE rowid > ? ORDER BY rowid LIMIT ?", (after, limit + 1)).fetchall()  # One more row tells if there is a next page
+        page = [{column: row[column] for column in POKEMON_COLUMNS} for row in rows[:limit]]
+        return page, (rows[limit - 1]['rowid'] if len(rows) > limit else None)
+
+    def pokemon(self, name):
+        """
+        Method to get the details and stats of a saved Pokémon in a single row, None if it isn't saved.
+        """
+        row = self.connection().execute(f"""SELECT {', '.join('pokemons.' + column for column in POKEMON_COLUMNS)}, {', '.join(STATS_COLUMNS[1:])}
+            FROM pokemons LEFT JOIN pokemons_stats ON pokemons_stats.name = pokemons.name WHERE pokemons.name = ?""", (name,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def names_without_image(self):
+        """
+        Method to get the names of the Pokémon whose stats were saved without an image URL.
+        """
+        return [row['name'] for row in self.connection().execute("SELECT name FROM pokemons_stats WHERE image IS NULL")]
+
+    def aggregate(self, db, pokemon_rows, stats_rows):
+        """
+        Method to add Pokémon to the running aggregates of the roster, in the transaction that saves them:
+        the number of Pokémon of each type and the count, sum, minimum, maximum and histogram of each stat.
+        pokemon_rows are new rows of the details and stats_rows new rows of the stats.
+        """
+        types = {}
+        for row in pokemon_rows:
+            for type in (row.get('type') or '').split(', '):
+                if type:
+                    types[type] = types.get(type, 0) + 1
+        stats = {}  # Stat -> [count, sum, min, max]
+        buckets = {}  # (stat, bucket) -> count
+        for row in stats_rows:
+            values = {column: int(row[column]) for column in STATS_COLUMNS[1:7] if row.get(column) is not None}
+            if len(values) == 6:
+                values['total'] = sum(values.values())  # Same as the total column
+            for stat, value in values.items():
+                aggregate = stats.get(stat)
+                if aggregate is None:
+                    stats[stat] = [1, value, value, value]
+                else:
+                    aggregate[0] += 1
+                    aggregate[1] += value
+                    aggregate[2] = min(aggregate[2], value)
+                    aggregate[3] = max(aggregate[3], value)
+                bucket = (stat, value // HISTOGRAM_WIDTHS.get(stat, HISTOGRAM_WIDTH))
+                buckets[bucket] = buckets.get(bucket, 0) + 1
+        db.executemany(ADD_TYPES, types.items())
+        db.executemany(ADD_STATS, [(stat, *aggregate) for stat, aggregate in stats.items()])
+        db.executemany(ADD_BUCKETS, [(stat, bucket, count) for (stat, bucket), count in buckets.items()])
+        db.execute(ADD_COUNT, (len(pokemon_rows),))
+
+    def reset_aggregates(self, db):
+        """
+        Method to empty the running aggregates of the roster.
+        """
+        db.execute("DELETE FROM type_counts")
+        db.execute("DELETE FROM stat_aggregates")
+        db.execute("DELETE FROM stat_histograms")
+        db.execute("UPDATE meta SET value = 0 WHERE key = 'pokemons'")
+
+    def rebuild_aggregates(self, db):
+        """
+        Method to compute the running aggregates again from the whole roster, only needed when saved rows are replaced.
+        """
+        self.reset_aggregates(db)
+        self.aggregate(db, [dict(row) for row in db.execute("SELECT type FROM pokemons")],
+                       [dict(row) for row in db.execute(f"SELECT {', '.join(STATS_COLUMNS[1:7])} FROM pokemons_stats")])
+
+    def summary(self, top=10):
+        """
+        Method to get the aggregates of the roster: its version, the number of Pokémon, the number of Pokémon of each type,
+        the minimum, maximum, mean and histogram of each stat and the top Pokémon by total stats.
+        It reads the running aggregates and the first rows of the total index, so it takes the same time whatever the size of the roster.
+        """
+        db = self.connection()
+        db.execute("BEGIN")  # Read everything from the same snapshot of the roster
+        try:
+            meta = dict(db.execute("SELECT key, value FROM meta WHERE key IN ('version', 'pokemons')").fetchall())
+            types = {row['type']: row['count'] for row in db.execute("SELECT type, count FROM type_counts ORDER BY count DESC, type")}
+            stats = {}
+            for row in db.execute("SELECT * FROM stat_aggregates"):
+                stats[row['stat']] = {'count': row['count'], 'min': row['min'], 'max': row['max'],
+                                      'mean': round(row['sum'] / row['count'], 2) if row['count'] else None, 'histogram': []}
+            for row in db.execute("SELECT * FROM stat_histograms ORDER BY stat, bucket"):
+                width = HISTOGRAM_WIDTHS.get(row['stat'], HISTOGRAM_WIDTH)
+                stats[row['stat']]['histogram'].append({'from': row['bucket'] * width, 'to': row['bucket'] * width + width - 1, 'count': row['count']})
+            ranking = [dict(row) for row in db.execute("SELECT name, total FROM pokemons_stats ORDER BY total DESC LIMIT ?", (top,))]  # Read from the total index
+        finally:
+            db.rollback()
+        return {
+            'version': meta['version'],
+            'pokemons': meta['pokemons'],
+            'types': types,
+            'stats': {stat: stats[stat] for stat in AGGREGATE_STATS if stat in stats},
+            'top': ranking
+        }
+
+    def clear(self):
+        """
+        Method to delete every saved Pokémon. Returns the number of rows that were deleted.
+        """
+        with self.connection() as db:
+            deleted = db.execute("DELETE FROM pokemons").rowcount
+            deleted += db.execute("DELETE FROM pokemons_stats").rowcount
+            self.reset_aggregates(db)
+            db.execute(BUMP_VERSION)
+            db.execute(BUMP_REWRITES)
+            self.sync_columns(db)
+        return deleted
+
+    def migrate_csv(self, pokemons_csv='pokemons.csv', stats_csv='pokemons_stats.csv'):
+        """
+        Method to import the CSV files written by older versions of the application.
+        Each imported file is renamed with a .migrated suffix so it is only imported once.
+        """
+        for path, columns, insert in [(pokemons_csv, POKEMON_COLUMNS, INSERT_POKEMON), (stats_csv, STATS_COLUMNS, INSERT_STATS)]:
+            if not os.path.exists(path):
+                continue
+            with open(path, newline='', encoding='utf-8') as f:
+                rows = [{column: row.get(column) or None for column in columns} for row in csv.DictReader(f)]  # Missing columns (eg. image) are saved as NULL
+            with self.connection() as db:
+                db.executemany(insert, rows)  # Import the whole file in a single transaction
+                self.rebuild_aggregates(db)
+                db.execute(BUMP_VERSION)
+                db.execute(BUMP_REWRITES)
+                self.sync_columns(db)
+            os.replace(path, path + '.migrated')
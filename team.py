@@ -0,0 +1,98 @@
+import numpy as np  # Importing numpy for scoring every team member against every opponent at once
+
+MAX_TEAM_SIZE = 6
+LOWEST_MULTIPLIER = 1 / 8  # Immunities are scored like a very resisted hit so the logarithm stays finite
+
+class TeamAnalysis():
+    """
+    Class representing the type matchups of a team of Pokémon against a set of opponents, computed as matrices over the type chart.
+    A score is log2(best multiplier dealt) - log2(best multiplier taken), so 2 means the member hits 2x and only takes 0.5x.
+    """
+
+    def __init__(self, chart, team, opponents):
+        """
+        Constructor method to initialize the TeamAnalysis object.
+        team and opponents are lists of (name, types) tuples, the team can have up to MAX_TEAM_SIZE Pokémon.
+        """
+        if not team or len(team) > MAX_TEAM_SIZE:
+            raise ValueError(f"A team must have between 1 and {MAX_TEAM_SIZE} Pokémon.")
+        self.chart = chart
+        self.team = [name for name, _ in team]
+        self.team_types = [list(types) for _, types in team]
+        self.opponents = [name for name, _ in opponents]
+        team_codes = chart.encode(self.team_types)
+        opponent_codes = chart.encode([types for _, types in opponents])
+        self.defense = chart.defense_many(team_codes)  # Damage each member takes from every attacking type
+        self.offense = chart.offense_many(team_codes)  # Best damage each member deals to every defending type
+        opponent_defense = np.hstack([chart.defense_many(opponent_codes), np.zeros((len(opponents), 1))])  # Padding column for single-typed members
+        team_defense = np.hstack([self.defense, np.zeros((len(team), 1))])  # Padding column for single-typed opponents
+        self.dealt = opponent_defense[:, team_codes].max(axis=2).T  # Best multiplier each member deals to each opponent with its own types
+        self.taken = team_defense[:, opponent_codes].max(axis=2)  # Best multiplier each opponent deals to each member with its own types
+        self.scores = np.log2(np.maximum(self.dealt, LOWEST_MULTIPLIER)) - np.log2(np.maximum(self.taken, LOWEST_MULTIPLIER))
+
+    def coverage_matrix(self):
+        """
+        Method to get the damage each member takes from every attacking type, as a dictionary member -> type -> multiplier.
+        """
+        names = self.chart.names.tolist()
+        return {member: dict(zip(names, row.tolist())) for member, row in zip(self.team, self.defense)}
+
+    def shared_weaknesses(self):
+        """
+        Method to get the attacking types that two or more members are weak to, most shared first.
+        Returns a list of (type, members) tuples.
+        """
+        weak = self.defense > 1
+        counts = weak.sum(axis=0)
+        shared = np.flatnonzero(counts >= 2)
+        shared = shared[np.argsort(-counts[shared], kind='stable')]
+        return [(self.chart.names[code], [self.team[i] for i in np.flatnonzero(weak[:, code])]) for code in shared]
+
+    def unresisted(self):
+        """
+        Method to get the attacking types that no member resists or is immune to.
+        """
+        return self.chart.names[(self.defense >= 1).all(axis=0)].tolist()
+
+    def uncovered(self):
+        """
+        Method to get the defending types that no member hits super effectively with its own types.
+        """
+        return self.chart.names[(self.offense <= 1).all(axis=0)].tolist()
+
+    def threats(self, limit=10):
+        """
+        Method to rank the opponents the team has the most trouble with, together with the best member to send against each of them.
+        Returns a list of (opponent, best counter, score) tuples, the lowest scores first.
+        """
+        best = self.scores.argmax(axis=0)  # Best member against each opponent
+        best_scores = self.scores[best, np.arange(len(self.opponents))]
+        count = min(limit, len(self.opponents))
+        ranked = np.argpartition(best_scores, count - 1)[:count] if count else np.zeros(0, dtype=np.intp)  # Only the worst matchups are sorted
+        ranked = ranked[np.argsort(best_scores[ranked], kind='stable')]
+        return [(self.opponents[i], self.team[best[i]], float(best_scores[i])) for i in ranked]
+
+    def members(self):
+        """
+        Method to rank the members by the number of opponents they beat (score above 0), then by their average score.
+        Returns a list of (member, wins, average score) tuples, the best member first.
+        """
+        wins = (self.scores > 0).sum(axis=1)
+        average = self.scores.mean(axis=1) if len(self.opponents) else np.zeros(len(self.team))
+        ranked = np.lexsort((-average, -wins))
+        return [(self.team[i], int(wins[i]), float(average[i])) for i in ranked]
+
+    def to_dict(self, limit=10):
+        """
+        Method to get the whole analysis as a dictionary that can be rendered or encoded as JSON.
+        """
+        return {
+            "team": [{"name": name, "type": types} for name, types in zip(self.team, self.team_types)],
+            "opponents": len(self.opponents),
+            "coverage": self.coverage_matrix(),
+            "shared_weaknesses": [{"type": type, "members": members} for type, members in self.shared_weaknesses()],
+            "unresisted": self.unresisted(),
+            "uncovered": self.uncovered(),
+            "threats": [{"name": name, "counter": counter, "score": round(score, 2)} for name, counter, score in self.threats(limit)],
+            "members": [{"name": name, "wins": wins, "score": round(score, 2)} for name, wins, score in self.members()]
+        }
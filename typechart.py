@@ -0,0 +1,96 @@
+import ast  # Importing the ast module to read the lists stored in types.csv
+import csv  # Importing the csv module to read types.csv
+import numpy as np  # Importing the numpy library for the damage multiplier matrix
+
+class TypeChart():
+    """
+    Class representing the type effectiveness chart as a matrix of damage multipliers.
+    matrix[attacker, defender] is the multiplier of a move of the attacking type against a Pokémon of the defending type.
+    """
+
+    def __init__(self, names, matrix):
+        """
+        Constructor method to initialize the TypeChart object.
+        """
+        self.names = np.array(names)  # Type names, in the order of the matrix rows and columns
+        self.index = {name: i for i, name in enumerate(names)}  # Type name -> row/column index
+        self.matrix = matrix
+        self.matchups = {}  # Cache of the matchups already computed for each type combination
+
+    @classmethod
+    def from_csv(cls, path='types.csv'):
+        """
+        Method to build the chart from the types.csv file created by PokemonGo.fetch_and_save_types_data.
+        """
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        names = [row['Type'] for row in rows]
+        index = {name: i for i, name in enumerate(names)}
+        matrix = np.ones((len(names), len(names)))
+        columns = [('Weaknesses', 2.0), ('Resistances', 0.5), ('Immunities', 0.0)]
+        for defender, row in enumerate(rows):
+            for column, multiplier in columns:
+                if not row.get(column):
+                    continue  # Files created by older versions lack the immunities
+                for attacker in ast.literal_eval(row[column]):  # The lists are stored as their Python representation
+                    if attacker in index:
+                        matrix[index[attacker], defender] = multiplier
+        return cls(names, matrix)
+
+    def codes(self, types):
+        """
+        Method to convert type names to matrix indexes, ignoring unknown types.
+        """
+        return [self.index[type] for type in types if type in self.index]
+
+    def defense(self, types):
+        """
+        Method to get the multiplier of every attacking type against a Pokémon with the given type(s).
+        """
+        return self.matrix[:, self.codes(types)].prod(axis=1)  # The multipliers of both types stack, eg. 2 x 2 = 4
+
+    def matchup(self, types):
+        """
+        Method to get the weaknesses, resistances, immunities and advantages of a type combination.
+        """
+        key = tuple(types)
+        matchup = self.matchups.get(key)
+        if matchup is None:
+            codes = self.codes(types)
+            defense = self.defense(types)
+            matchup = {
+                "weaknesses": sorted(self.names[defense > 1].tolist()),
+                "resistances": sorted(self.names[(defense > 0) & (defense < 1)].tolist()),
+                "immunities": sorted(self.names[defense == 0].tolist()),
+                "advantages": sorted(self.names[(self.matrix[codes, :] > 1).any(axis=0)].tolist()),  # Types hit super effectively by any of the Pokémon's types
+                "multipliers": dict(zip(self.names.tolist(), defense.tolist()))
+            }
+            self.matchups[key] = matchup
+        return matchup
+
+    def encode(self, type_lists):
+        """
+        Method to convert the type(s) of many Pokémon to an array of matrix indexes with one row per Pokémon.
+        Pokémon with a single type get len(names) as their second index, which refers to the padding added by defense_many and offense_many.
+        """
+        codes = np.full((len(type_lists), 2), len(self.names), dtype=np.intp)
+        for row, types in enumerate(type_lists):
+            known = self.codes(types)[:2]
+            codes[row, :len(known)] = known
+        return codes
+
+    def defense_many(self, codes):
+        """
+        Method to get the multiplier of every attacking type against many Pokémon at once, given their encoded types.
+        Returns an array with one row per Pokémon and one column per attacking type.
+        """
+        matrix = np.hstack([self.matrix, np.ones((len(self.names), 1))])  # A missing second type doesn't change the damage
+        return (matrix[:, codes[:, 0]] * matrix[:, codes[:, 1]]).T
+
+    def offense_many(self, codes):
+        """
+        Method to get the best multiplier that many Pokémon get with moves of their own types against every defending type, given their encoded types.
+        Returns an array with one row per Pokémon and one column per defending type.
+        """
+        matrix = np.vstack([self.matrix, np.zeros((1, len(self.names)))])  # A missing second type never deals the most damage
+        return np.maximum(matrix[codes[:, 0], :], matrix[codes[:, 1], :])